@@ -1,5 +1,10 @@
 """
 App package - Main application package
+
+Cache trong process: các handler đồng bộ (def) chạy song song trong threadpool của FastAPI
+và TTLCache không thread-safe, nên mọi TTLCache cấp module chỉ được đọc/ghi khi giữ lock
+riêng của nó (tên kết thúc bằng _LOCK, khai báo ngay cạnh cache). Các cache này nằm riêng
+trong từng worker: chỉ dùng cho dữ liệu chấp nhận được việc lệch giữa các worker.
 """
 
 __version__ = "1.0.0"
@@ -3,6 +3,8 @@ Cấu hình chính cho ứng dụng Todo List
 Sử dụng Pydantic Settings để quản lý cấu hình môi trường
 """
 
+from functools import lru_cache
+from pydantic import AliasChoices, Field
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -13,28 +15,51 @@ class Settings(BaseSettings):
     # Cấu hình ứng dụng cơ bản
     app_name: str = "VTeam"
     app_url: str = "http://localhost:8000"
-    SECRET_KEY: str = "your-super-secret-key-change-this-in-production"
-    ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
-    # Aliases cho tương thích
-    secret_key: str = "your-super-secret-key-change-this-in-production"
-    algorithm: str = "HS256"
-    access_token_expire_minutes: int = 30
+    # Cấu hình JWT (nhận cả SECRET_KEY/secret_key, ALGORITHM/algorithm)
+    secret_key: str = Field(
+        "your-super-secret-key-change-this-in-production",
+        validation_alias=AliasChoices("SECRET_KEY", "secret_key")
+    )
+    algorithm: str = Field("HS256", validation_alias=AliasChoices("ALGORITHM", "algorithm"))
+    
+    # Thời hạn access token (nhận cả ACCESS_TOKEN_EXPIRE_MINUTES/access_token_expire_minutes)
+    access_token_expire_minutes: int = Field(
+        30,
+        validation_alias=AliasChoices("ACCESS_TOKEN_EXPIRE_MINUTES", "access_token_expire_minutes")
+    )
     
     # Cấu hình cơ sở dữ liệu
     database_url: str = "sqlite:///./todo_app.db"
+    # Pool kết nối: các request auth ngắn và dồn dập nên cần pool lớn, recycle sớm.
+    # Khi đứng sau PgBouncer (transaction mode) đặt DB_USE_PGBOUNCER=true để dùng NullPool
+    db_pool_size: int = 20
+    db_max_overflow: int = 40
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 300
+    db_use_pgbouncer: bool = False
+    
+    # Giới hạn đăng nhập sai theo IP: tối đa LOGIN_RATE_LIMIT lần sai trong
+    # LOGIN_RATE_WINDOW giây gần nhất (cửa sổ trượt)
+    login_rate_limit: int = 10
+    login_rate_window: int = 60
     
-    # Cấu hình Email từ .env
-    SMTP_SERVER: str = "smtp.gmail.com"
+    # Job dọn tài khoản đăng ký bỏ dở mỗi giờ trong lifespan của app. Mặc định tắt: chỉ bật
+    # trên đúng một instance/worker, hoặc chạy cleanup_unverified_users.py bằng cron
+    cleanup_unverified_users_enabled: bool = False
+    
+    # Cấu hình Email từ .env (SMTP_SERVER/SMTP_HOST, EMAIL_FROM/FROM_EMAIL là cùng một trường)
+    smtp_server: str = Field(
+        "smtp.gmail.com",
+        validation_alias=AliasChoices("SMTP_SERVER", "SMTP_HOST", "smtp_server")
+    )
     SMTP_PORT: int = 587
     SMTP_USERNAME: Optional[str] = None
     SMTP_PASSWORD: Optional[str] = None
-    EMAIL_FROM: Optional[str] = None
-    
-    # Aliases cho tương thích với email service
-    SMTP_HOST: str = "smtp.gmail.com"
-    FROM_EMAIL: Optional[str] = None
+    email_from: Optional[str] = Field(
+        None,
+        validation_alias=AliasChoices("EMAIL_FROM", "FROM_EMAIL", "email_from")
+    )
     FROM_NAME: str = "Todo List Team"
     
     # Cấu hình 2FA
@@ -44,10 +69,44 @@ class Settings(BaseSettings):
     environment: str = "development"
     debug: bool = True
 
+    @property
+    def SECRET_KEY(self) -> str:
+        return self.secret_key
+    
+    @property
+    def ALGORITHM(self) -> str:
+        return self.algorithm
+    
+    @property
+    def ACCESS_TOKEN_EXPIRE_MINUTES(self) -> int:
+        return self.access_token_expire_minutes
+    
+    @property
+    def SMTP_SERVER(self) -> str:
+        return self.smtp_server
+    
+    @property
+    def SMTP_HOST(self) -> str:
+        return self.smtp_server
+    
+    @property
+    def EMAIL_FROM(self) -> Optional[str]:
+        return self.email_from
+    
+    @property
+    def FROM_EMAIL(self) -> Optional[str]:
+        return self.email_from
+
     class Config:
         env_file = ".env"
         case_sensitive = False
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Trả về instance cấu hình dùng chung, chỉ đọc .env ở lần gọi đầu tiên"""
+    return Settings()
+
+
 # Tạo instance cấu hình toàn cục
-settings = Settings()
\ No newline at end of file
+settings = get_settings()
\ No newline at end of file
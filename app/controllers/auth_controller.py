@@ -6,36 +6,188 @@ Controller xử lý các request liên quan đến authentication
 Điều phối giữa Router và Service layer
 """
 
-from typing import Dict, Any
+import logging
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Any, Optional
+from hmac import compare_digest
+from cachetools import TTLCache
+from sqlalchemy import bindparam, func, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from fastapi import HTTPException, status
-import random
+from fastapi import BackgroundTasks, HTTPException, status
 
 from ..models.user import User
 from ..schemas import (
-    UserCreate, UserResponse, UserLogin, Token, Message,
-    Enable2FA, Verify2FA, EmailOTPRequest, EmailOTPVerify, UserUpdate, PasswordChange
+    UserCreate, UserResponse, UserLogin, Token, Verify2FA,
+    EmailOTPRequest, EmailOTPVerify, UserUpdate, PasswordChange
 )
-from ..services.auth_service import AuthService
+from ..config import settings
+from ..services.auth_service import auth_service
 from ..services.email_service import email_service
-from ..utils.auth import generate_email_otp, is_otp_expired
+from ..utils.auth import ACCESS_TTL, generate_email_otp, is_otp_expired
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
+# Thời hạn access token (giây) và OTP (tạo một lần khi load module)
+_ACCESS_TTL_SECONDS = int(ACCESS_TTL.total_seconds())
+_OTP_TTL = timedelta(minutes=5)
+
+# Các trường của User được phép cập nhật qua profile
+_USER_UPDATABLE = frozenset({"full_name", "phone_number", "avatar_url"})
+
+# Các trường của UserResponse, đọc thẳng từ ORM (dữ liệu tin cậy, bỏ qua validate)
+_PROFILE_FIELDS = tuple(UserResponse.model_fields)
+
+# Truy vấn user theo email dựng sẵn với tham số :email
+_BY_EMAIL = User.email == bindparam("email")
+
+# Đăng nhập chỉ đọc các cột xác thực dạng tuple, không dựng object User
+# (bỏ qua backup_codes, avatar_url...)
+_PASSWORD_LOGIN_SELECT = select(
+    User.id, User.email, User.hashed_password, User.is_active, User.is_verified,
+    User.is_2fa_enabled, User.totp_secret
+).where(_BY_EMAIL)
+_OTP_LOGIN_SELECT = select(
+    User.id, User.email, User.is_active, User.is_verified, User.email_otp, User.email_otp_expiry
+).where(_BY_EMAIL)
+# Các cột cần cho xác thực email / gửi lại OTP (kèm full_name để gửi email)
+_EMAIL_OTP_SELECT = select(
+    User.id, User.email, User.full_name, User.is_active, User.is_verified,
+    User.email_otp, User.email_otp_expiry
+).where(_BY_EMAIL)
+# Object User đầy đủ (đăng ký lại email đã tồn tại)
+_USER_BY_EMAIL_SELECT = select(User).where(_BY_EMAIL)
+
+# INSERT hỗ trợ ON CONFLICT DO NOTHING theo dialect (dùng cho đăng ký)
+_INSERT_BY_DIALECT = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+@lru_cache(maxsize=None)
+def _has_unique_email(bind) -> bool:
+    """
+    Kiểm tra (một lần cho mỗi engine) users.email có unique index/constraint hay không.
+    ON CONFLICT (email) cần ràng buộc này; ensure_schema có thể bỏ qua việc tạo index
+    khi dữ liệu cũ bị trùng
+    
+    Args:
+        bind: Engine của session
+        
+    Returns:
+        bool: True nếu có unique index hoặc unique constraint chỉ trên cột email
+    """
+    inspector = inspect(bind)
+    unique_column_sets = [
+        index["column_names"] for index in inspector.get_indexes("users") if index["unique"]
+    ] + [constraint["column_names"] for constraint in inspector.get_unique_constraints("users")]
+    return ["email"] in unique_column_sets
+
+
+# Giới hạn số lần đăng nhập sai của mỗi IP trong cửa sổ trượt settings.login_rate_window
+# giây: chỉ đếm lần sai (email/mật khẩu/mã 2FA), đăng nhập thành công không bị tính.
+# IP là request.client.host: khi chạy sau reverse proxy cần bật --proxy-headers và
+# --forwarded-allow-ips của uvicorn để client.host là IP thật, nếu không mọi client
+# dùng chung IP của proxy
+_LOGIN_FAILURES: TTLCache = TTLCache(maxsize=10_000, ttl=settings.login_rate_window)
+_LOGIN_FAILURES_LOCK = threading.Lock()
+
+
+def _check_login_rate(client_host: Optional[str]) -> None:
+    """
+    Từ chối đăng nhập nếu IP đã sai quá số lần cho phép trong cửa sổ hiện tại
+    
+    Args:
+        client_host: Địa chỉ IP của client (None nếu không xác định)
+        
+    Raises:
+        HTTPException: Nếu IP vượt quá giới hạn đăng nhập sai
+    """
+    if client_host is None:
+        return
+    cutoff = time.monotonic() - settings.login_rate_window
+    with _LOGIN_FAILURES_LOCK:
+        failures = _LOGIN_FAILURES.get(client_host)
+        while failures and failures[0] <= cutoff:
+            failures.popleft()
+        blocked = failures is not None and len(failures) >= settings.login_rate_limit
+    if blocked:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Quá nhiều lần đăng nhập sai. Vui lòng thử lại sau."
+        )
+
+
+def _record_login_failure(client_host: Optional[str]) -> None:
+    """Ghi nhận một lần đăng nhập sai của IP (chỉ giữ login_rate_limit mốc gần nhất)"""
+    if client_host is None:
+        return
+    with _LOGIN_FAILURES_LOCK:
+        failures = _LOGIN_FAILURES.get(client_host) or deque(maxlen=settings.login_rate_limit)
+        failures.append(time.monotonic())
+        # Gán lại để gia hạn TTL tính từ lần sai gần nhất
+        _LOGIN_FAILURES[client_host] = failures
+
+
+# Giới hạn số lần nhập sai OTP email của mỗi email trong thời hạn OTP: vượt quá thì
+# từ chối ngay, không truy vấn DB. Đếm lại từ đầu khi OTP mới được gửi hoặc xác thực
+# thành công
+_OTP_MAX_FAILURES = 5
+_OTP_FAILURES: TTLCache = TTLCache(maxsize=10_000, ttl=int(_OTP_TTL.total_seconds()))
+_OTP_FAILURES_LOCK = threading.Lock()
+
+
+def _check_otp_attempts(email: str) -> None:
+    """
+    Từ chối xác thực OTP nếu email đã nhập sai quá số lần cho phép
+    
+    Args:
+        email: Email đang xác thực OTP
+        
+    Raises:
+        HTTPException: Nếu đã nhập sai quá _OTP_MAX_FAILURES lần
+    """
+    with _OTP_FAILURES_LOCK:
+        failures = _OTP_FAILURES.get(email, 0)
+    if failures >= _OTP_MAX_FAILURES:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Nhập sai OTP quá nhiều lần. Vui lòng yêu cầu mã mới."
+        )
+
+
+def _record_otp_failure(email: str) -> None:
+    """Ghi nhận một lần nhập sai OTP của email"""
+    with _OTP_FAILURES_LOCK:
+        _OTP_FAILURES[email] = _OTP_FAILURES.get(email, 0) + 1
+
+
+def _reset_otp_failures(email: str) -> None:
+    """Xóa bộ đếm nhập sai OTP khi có OTP mới hoặc xác thực thành công"""
+    with _OTP_FAILURES_LOCK:
+        _OTP_FAILURES.pop(email, None)
+
 
 class AuthController:
     """Controller xử lý authentication logic"""
     
     def __init__(self):
-        self.auth_service = AuthService()
+        self.auth_service = auth_service
         self.email_service = email_service
     
-    async def register_user(self, user_data: UserCreate, db: Session) -> Dict[str, str]:
+    def register_user(
+        self, user_data: UserCreate, db: Session, background_tasks: BackgroundTasks
+    ) -> Dict[str, str]:
         """
         Đăng ký người dùng mới (Bước 1: Tạo tài khoản và gửi OTP)
         
         Args:
             user_data: Thông tin đăng ký người dùng
             db: Database session
+            background_tasks: Hàng đợi tác vụ nền để gửi email
             
         Returns:
             Dict: Thông báo kết quả
@@ -43,31 +195,6 @@ class AuthController:
         Raises:
             HTTPException: Nếu email đã tồn tại
         """
-        # Kiểm tra email đã tồn tại và đã được xác thực
-        print(f"🔍 Checking email: {user_data.email}")
-        verified_user = db.query(User).filter(
-            User.email == user_data.email, 
-            User.is_verified == True
-        ).first()
-        if verified_user:
-            print(f"Email already verified: {verified_user.email} (ID: {verified_user.id})")
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Email đã được sử dụng"
-            )
-        
-        # Xóa user chưa xác thực cũ nếu có (để cho phép đăng ký lại)
-        unverified_user = db.query(User).filter(
-            User.email == user_data.email,
-            User.is_verified == False
-        ).first()
-        if unverified_user:
-            print(f"🗑️ Removing old unverified user: {unverified_user.email}")
-            db.delete(unverified_user)
-            db.commit()
-        
-        print(f"Email available: {user_data.email}")
-        
         # Hash password
         hashed_password = self.auth_service.get_password_hash(user_data.password)
         
@@ -75,40 +202,78 @@ class AuthController:
         otp_code = generate_email_otp()
         
         # Tạo user mới (chưa xác thực) - CHỈ sau khi xác thực OTP mới set is_verified=True
-        new_user = User(
-            email=user_data.email,
-            hashed_password=hashed_password,
-            full_name=user_data.full_name,
-            phone_number=user_data.phone_number,
-            is_active=True,
-            is_verified=False,  # Chưa xác thực - quan trọng!
-            email_otp=otp_code,
-            email_otp_expiry=datetime.utcnow() + timedelta(minutes=5)
-        )
+        now = datetime.utcnow()
+        user_values = {
+            "email": user_data.email,
+            "hashed_password": hashed_password,
+            "full_name": user_data.full_name,
+            "phone_number": user_data.phone_number,
+            "is_active": True,
+            "is_verified": False,  # Chưa xác thực - quan trọng!
+            "email_otp": otp_code,
+            "email_otp_expiry": now + _OTP_TTL
+        }
+        
+        # Email mới (trường hợp thường gặp): INSERT ... ON CONFLICT (email) DO NOTHING
+        # RETURNING id, kiểm tra trùng và tạo user trong một round-trip
+        bind = db.get_bind()
+        insert = _INSERT_BY_DIALECT.get(bind.dialect.name)
+        created = None
+        if insert is not None and _has_unique_email(bind):
+            created = db.execute(
+                insert(User)
+                .values(**user_values)
+                .on_conflict_do_nothing(index_elements=[User.email])
+                .returning(User.id)
+            ).first()
+        
+        if created is None:
+            # Email đã tồn tại (hoặc dialect không hỗ trợ ON CONFLICT / thiếu unique index
+            # trên email): phân nhánh theo is_verified
+            logger.debug("Checking email: %s", user_data.email)
+            existing_user = db.scalar(_USER_BY_EMAIL_SELECT, {"email": user_data.email})
+            if existing_user and existing_user.is_verified:
+                logger.debug("Email already verified: %s (ID: %s)", existing_user.email, existing_user.id)
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Email đã được sử dụng"
+                )
+            
+            # Xóa user chưa xác thực cũ nếu có (để cho phép đăng ký lại)
+            # flush để DELETE chạy trước INSERT trong cùng transaction (email là unique)
+            if existing_user:
+                logger.debug("Removing old unverified user: %s", existing_user.email)
+                db.delete(existing_user)
+                db.flush()
+            
+            db.add(User(**user_values))
         
-        # Lưu vào database
-        db.add(new_user)
+        # Lưu vào database (một commit cho cả xóa user cũ và tạo user mới)
         db.commit()
-        db.refresh(new_user)
+        _reset_otp_failures(user_data.email)
         
-        # Gửi OTP qua email
-        await self.email_service.send_otp_email(
-            new_user.email, 
+        # Gửi OTP qua email (chạy nền sau khi trả response)
+        background_tasks.add_task(
+            self.email_service.send_otp_email,
+            user_data.email, 
             otp_code, 
-            new_user.full_name or new_user.email.split('@')[0]
+            user_data.full_name or user_data.email.split('@')[0]
         )
         
         return {
             "message": " Mã OTP đã được gửi tới email, vui lòng xác thực trong 5 phút."
         }
     
-    async def verify_email(self, verify_data: EmailOTPVerify, db: Session) -> Dict[str, str]:
+    def verify_email(
+        self, verify_data: EmailOTPVerify, db: Session, background_tasks: BackgroundTasks
+    ) -> Dict[str, str]:
         """
         Xác thực email bằng OTP (Bước 2 của đăng ký)
         
         Args:
             verify_data: Email và OTP code
             db: Database session
+            background_tasks: Hàng đợi tác vụ nền để gửi email
             
         Returns:
             Dict: Thông báo kết quả
@@ -116,8 +281,11 @@ class AuthController:
         Raises:
             HTTPException: Nếu OTP không hợp lệ hoặc đã hết hạn
         """
+        _check_otp_attempts(verify_data.email)
+        now = datetime.utcnow()
+        
         # Tìm user theo email
-        user = db.query(User).filter(User.email == verify_data.email).first()
+        user = db.execute(_EMAIL_OTP_SELECT, {"email": verify_data.email}).first()
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -130,31 +298,40 @@ class AuthController:
         
         # Xác thực OTP
         if (not user.email_otp or 
-            user.email_otp != verify_data.otp_code or 
-            is_otp_expired(user.email_otp_expiry)):
+            is_otp_expired(user.email_otp_expiry, now) or 
+            not compare_digest(user.email_otp.encode(), verify_data.otp_code.encode())):
+            _record_otp_failure(verify_data.email)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Mã OTP không hợp lệ hoặc đã hết hạn"
             )
         
-        # Kích hoạt tài khoản
-        user.is_verified = True
-        user.email_otp = None
-        user.email_otp_expiry = None
+        # Kích hoạt tài khoản bằng một câu UPDATE (không qua unit-of-work của ORM)
+        db.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(is_verified=True, email_otp=None, email_otp_expiry=None)
+        )
         db.commit()
+        _reset_otp_failures(verify_data.email)
         
-        # Gửi email chào mừng
-        await self.email_service.send_welcome_email(user.email, user.full_name or user.email.split('@')[0])
+        # Gửi email chào mừng (chạy nền)
+        background_tasks.add_task(
+            self.email_service.send_welcome_email, user.email, user.full_name or user.email.split('@')[0]
+        )
         
         return {"message": "Xác thực email thành công. Bạn có thể đăng nhập."}
     
-    async def resend_registration_otp(self, email_req: EmailOTPRequest, db: Session) -> Dict[str, str]:
+    def resend_registration_otp(
+        self, email_req: EmailOTPRequest, db: Session, background_tasks: BackgroundTasks
+    ) -> Dict[str, str]:
         """
         Gửi lại OTP đăng ký
         
         Args:
             email_req: Email request
             db: Database session
+            background_tasks: Hàng đợi tác vụ nền để gửi email
             
         Returns:
             Dict: Thông báo kết quả
@@ -163,7 +340,7 @@ class AuthController:
             HTTPException: Nếu không tìm thấy tài khoản hoặc đã xác thực
         """
         # Tìm user
-        user = db.query(User).filter(User.email == email_req.email).first()
+        user = db.execute(_EMAIL_OTP_SELECT, {"email": email_req.email}).first()
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -176,36 +353,48 @@ class AuthController:
         
         # Tạo OTP mới
         otp_code = generate_email_otp()
-        user.email_otp = otp_code
-        user.email_otp_expiry = datetime.utcnow() + timedelta(minutes=5)
+        db.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(email_otp=otp_code, email_otp_expiry=datetime.utcnow() + _OTP_TTL)
+        )
         db.commit()
+        _reset_otp_failures(email_req.email)
         
-        # Gửi OTP
-        await self.email_service.send_otp_email(user.email, otp_code, user.full_name or user.email.split('@')[0])
+        # Gửi OTP (chạy nền)
+        background_tasks.add_task(
+            self.email_service.send_otp_email, user.email, otp_code, user.full_name or user.email.split('@')[0]
+        )
         
         return {"message": "Đã gửi lại OTP. Vui lòng kiểm tra email."}
     
-    async def login_user(self, user_credentials: UserLogin, db: Session) -> Dict[str, Any]:
+    def login_user(
+        self, user_credentials: UserLogin, db: Session, client_host: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Đăng nhập người dùng
         
         Args:
             user_credentials: Thông tin đăng nhập
             db: Database session
+            client_host: IP của client, dùng để giới hạn số lần login
             
         Returns:
             Dict: Token thông tin
             
         Raises:
-            HTTPException: Nếu thông tin đăng nhập không hợp lệ
+            HTTPException: Nếu thông tin đăng nhập không hợp lệ hoặc login quá nhiều lần
         """
+        _check_login_rate(client_host)
+        
         # Tìm user theo email
-        user = db.query(User).filter(User.email == user_credentials.email).first()
+        user = db.execute(_PASSWORD_LOGIN_SELECT, {"email": user_credentials.email}).first()
         
         if not user or not self.auth_service.verify_password(
             user_credentials.password, 
             user.hashed_password
         ):
+            _record_login_failure(client_host)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Email hoặc mật khẩu không chính xác"
@@ -234,40 +423,44 @@ class AuthController:
                 )
             
             if not self.auth_service.verify_totp(user.totp_secret, user_credentials.totp_code):
+                _record_login_failure(client_host)
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Mã 2FA không chính xác"
                 )
         
-        # Update last login
-        user.last_login = datetime.utcnow()
+        # Update last login bằng một câu UPDATE theo id (user là row, không phải object ORM),
+        # thời gian lấy phía database
+        db.execute(update(User).where(User.id == user.id).values(last_login=func.now()))
         db.commit()
         
         # Tạo access token
-        access_token_expires = timedelta(minutes=30)  # 30 phút
         access_token = self.auth_service.create_access_token(
             data={"sub": str(user.id), "email": user.email},
-            expires_delta=access_token_expires
+            expires_delta=ACCESS_TTL
         )
         
         return {
             "access_token": access_token,
             "token_type": "bearer",
-            "expires_in": 30 * 60  # 30 phút tính bằng giây
+            "expires_in": _ACCESS_TTL_SECONDS
         }
     
-    async def send_login_otp(self, email_req: EmailOTPRequest, db: Session) -> Dict[str, str]:
+    def send_login_otp(
+        self, email_req: EmailOTPRequest, db: Session, background_tasks: BackgroundTasks
+    ) -> Dict[str, str]:
         """
         Gửi OTP để đăng nhập (thay thế 2FA)
         
         Args:
             email_req: Email request
             db: Database session
+            background_tasks: Hàng đợi tác vụ nền để gửi email
             
         Returns:
             Dict: Thông báo kết quả
         """
-        user = db.query(User).filter(User.email == email_req.email).first()
+        user = db.execute(_EMAIL_OTP_SELECT, {"email": email_req.email}).first()
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -288,15 +481,21 @@ class AuthController:
         
         # Tạo và gửi OTP
         otp = generate_email_otp()
-        user.email_otp = otp
-        user.email_otp_expiry = datetime.utcnow() + timedelta(minutes=5)
+        db.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(email_otp=otp, email_otp_expiry=datetime.utcnow() + _OTP_TTL)
+        )
         db.commit()
+        _reset_otp_failures(email_req.email)
         
-        await self.email_service.send_otp_email(user.email, otp, user.full_name or user.email.split('@')[0])
+        background_tasks.add_task(
+            self.email_service.send_otp_email, user.email, otp, user.full_name or user.email.split('@')[0]
+        )
         
         return {"message": "Mã OTP đã được gửi qua email và có hiệu lực trong 5 phút"}
     
-    async def login_with_otp(self, otp_data: EmailOTPVerify, db: Session) -> Dict[str, Any]:
+    def login_with_otp(self, otp_data: EmailOTPVerify, db: Session) -> Dict[str, Any]:
         """
         Đăng nhập bằng OTP email
         
@@ -307,7 +506,9 @@ class AuthController:
         Returns:
             Dict: Token thông tin
         """
-        user = db.query(User).filter(User.email == otp_data.email).first()
+        _check_otp_attempts(otp_data.email)
+        now = datetime.utcnow()
+        user = db.execute(_OTP_LOGIN_SELECT, {"email": otp_data.email}).first()
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -328,33 +529,37 @@ class AuthController:
         
         # Xác thực OTP
         if (not user.email_otp or 
-            user.email_otp != otp_data.otp_code or
-            is_otp_expired(user.email_otp_expiry)):
+            is_otp_expired(user.email_otp_expiry, now) or
+            not compare_digest(user.email_otp.encode(), otp_data.otp_code.encode())):
+            _record_otp_failure(otp_data.email)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Mã OTP không hợp lệ hoặc đã hết hạn"
             )
         
-        # Xóa OTP sau khi sử dụng và update last login
-        user.email_otp = None
-        user.email_otp_expiry = None
-        user.last_login = datetime.utcnow()
+        # Xóa OTP sau khi sử dụng và update last login trong cùng một câu UPDATE
+        db.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(email_otp=None, email_otp_expiry=None, last_login=func.now())
+        )
         db.commit()
+        _reset_otp_failures(otp_data.email)
         
         # Tạo access token
-        access_token_expires = timedelta(minutes=30)
         access_token = self.auth_service.create_access_token(
             data={"sub": str(user.id), "email": user.email},
-            expires_delta=access_token_expires
+            expires_delta=ACCESS_TTL,
+            now=now
         )
         
         return {
             "access_token": access_token,
             "token_type": "bearer",
-            "expires_in": 30 * 60
+            "expires_in": _ACCESS_TTL_SECONDS
         }
     
-    async def enable_2fa(self, current_user: User, db: Session) -> Dict[str, Any]:
+    def enable_2fa(self, current_user: User, db: Session) -> Dict[str, Any]:
         """
         Bật 2FA cho tài khoản
         
@@ -381,7 +586,7 @@ class AuthController:
         
         # Lưu secret (chưa enable 2FA)
         current_user.totp_secret = secret
-        current_user.backup_codes = ','.join(hashed_backup_codes)
+        current_user.backup_codes = hashed_backup_codes
         db.commit()
         
         return {
@@ -391,7 +596,7 @@ class AuthController:
             "message": "Vui lòng quét QR code bằng Google Authenticator và nhập mã 6 số để hoàn tất việc bật 2FA"
         }
     
-    async def verify_and_enable_2fa(self, verify_data: Verify2FA, current_user: User, db: Session) -> Dict[str, str]:
+    def verify_and_enable_2fa(self, verify_data: Verify2FA, current_user: User, db: Session) -> Dict[str, str]:
         """
         Xác thực và hoàn tất việc bật 2FA
         
@@ -428,7 +633,7 @@ class AuthController:
         
         return {"message": "2FA đã được bật thành công cho tài khoản của bạn"}
     
-    async def disable_2fa(self, verify_data: Verify2FA, current_user: User, db: Session) -> Dict[str, str]:
+    def disable_2fa(self, verify_data: Verify2FA, current_user: User, db: Session) -> Dict[str, str]:
         """
         Tắt 2FA cho tài khoản
         
@@ -471,17 +676,8 @@ class AuthController:
         Returns:
             UserResponse: Thông tin user
         """
-        return UserResponse(
-            id=current_user.id,
-            email=current_user.email,
-            full_name=current_user.full_name,
-            phone_number=current_user.phone_number,
-            avatar_url=current_user.avatar_url,
-            is_active=current_user.is_active,
-            is_verified=current_user.is_verified,
-            is_2fa_enabled=current_user.is_2fa_enabled,
-            created_at=current_user.created_at,
-            last_login=current_user.last_login
+        return UserResponse.model_construct(
+            **{field: getattr(current_user, field) for field in _PROFILE_FIELDS}
         )
     
     def update_user_profile(self, current_user: User, update_data: UserUpdate, db: Session) -> UserResponse:
@@ -500,18 +696,20 @@ class AuthController:
         update_dict = update_data.model_dump(exclude_unset=True)
         
         for field, value in update_dict.items():
-            if hasattr(current_user, field):
+            if field in _USER_UPDATABLE:
                 setattr(current_user, field, value)
         
         # Cập nhật thời gian
         current_user.updated_at = datetime.utcnow()
         
+        # Dựng profile từ giá trị đang có trong object trước khi commit làm expire,
+        # không cần refresh (SELECT lại) sau commit
+        profile = self.get_user_profile(current_user)
         db.commit()
-        db.refresh(current_user)
         
-        return self.get_user_profile(current_user)
+        return profile
     
-    async def change_password(self, password_data: PasswordChange, current_user: User, db: Session) -> Dict[str, str]:
+    def change_password(self, password_data: PasswordChange, current_user: User, db: Session) -> Dict[str, str]:
         """
         Đổi mật khẩu của user hiện tại
         
@@ -1,9 +1,13 @@
 """
 Tasks API Controller - Quản lý công việc
 """
-from fastapi import APIRouter, HTTPException, Query
+import logging
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import DefaultDict, Optional, Set
+from collections import OrderedDict, defaultdict
+from itertools import count, islice
 from datetime import datetime
 
 # Schemas
@@ -33,9 +37,10 @@ class Task(BaseModel):
     team_id: Optional[int] = None
 
 # Router
-router = APIRouter(prefix="/api/v1/tasks", tags=["Tasks"])
+router = APIRouter(prefix="/api/v1/tasks", tags=["Tasks"], default_response_class=ORJSONResponse)
+logger = logging.getLogger(__name__)
 
-# Mock data
+# Mock data (thời gian lưu dạng datetime, ORJSON serialize trực tiếp)
 MOCK_TASKS = [
     {
         "id": 1,
@@ -43,9 +48,9 @@ MOCK_TASKS = [
         "description": "Tổng hợp kết quả công việc tuần này",
         "priority": "high",
         "status": "in_progress",
-        "due_date": "2025-09-30T23:59:59",
-        "created_at": "2025-09-26T10:00:00",
-        "updated_at": "2025-09-26T10:00:00",
+        "due_date": datetime(2025, 9, 30, 23, 59, 59),
+        "created_at": datetime(2025, 9, 26, 10, 0, 0),
+        "updated_at": datetime(2025, 9, 26, 10, 0, 0),
         "assignee_id": 1,
         "team_id": 1
     },
@@ -55,9 +60,9 @@ MOCK_TASKS = [
         "description": "Kiểm tra và review các pull request mới",
         "priority": "medium",
         "status": "todo",
-        "due_date": "2025-09-28T17:00:00",
-        "created_at": "2025-09-26T09:30:00",
-        "updated_at": "2025-09-26T09:30:00",
+        "due_date": datetime(2025, 9, 28, 17, 0, 0),
+        "created_at": datetime(2025, 9, 26, 9, 30, 0),
+        "updated_at": datetime(2025, 9, 26, 9, 30, 0),
         "assignee_id": 1,
         "team_id": 1
     },
@@ -67,15 +72,47 @@ MOCK_TASKS = [
         "description": "Cập nhật documentation cho các API mới",
         "priority": "low",
         "status": "completed",
-        "due_date": "2025-09-27T16:00:00",
-        "created_at": "2025-09-25T14:00:00",
-        "updated_at": "2025-09-26T11:00:00",
+        "due_date": datetime(2025, 9, 27, 16, 0, 0),
+        "created_at": datetime(2025, 9, 25, 14, 0, 0),
+        "updated_at": datetime(2025, 9, 26, 11, 0, 0),
         "assignee_id": 1,
         "team_id": 1
     }
 ]
 
-@router.get("/", response_model=List[dict])
+# Kho task đánh chỉ mục theo id, status và priority
+_TASKS: "OrderedDict[int, dict]" = OrderedDict((task["id"], task) for task in MOCK_TASKS)
+_BY_STATUS: DefaultDict[str, Set[int]] = defaultdict(set)
+_BY_PRIORITY: DefaultDict[str, Set[int]] = defaultdict(set)
+_NO_IDS: frozenset = frozenset()
+_NEXT_ID = count(max(_TASKS, default=0) + 1)
+
+
+def _index_task(task: dict) -> None:
+    """Thêm task vào các chỉ mục status/priority"""
+    _BY_STATUS[task["status"]].add(task["id"])
+    _BY_PRIORITY[task["priority"]].add(task["id"])
+
+
+def _unindex_task(task: dict) -> None:
+    """Gỡ task khỏi các chỉ mục status/priority"""
+    _BY_STATUS[task["status"]].discard(task["id"])
+    _BY_PRIORITY[task["priority"]].discard(task["id"])
+
+
+for _task in _TASKS.values():
+    _index_task(_task)
+
+# Khuôn JSON cho health check, chỉ chèn số task hiện tại
+_HEALTH_TEMPLATE = '{"status":"healthy","service":"tasks","version":"1.0.0","total_tasks":%d}'
+
+# Khai báo trước /{task_id} để "/health" không bị hiểu là task_id
+@router.get("/health", response_model=dict)
+async def health_check():
+    """Health check"""
+    return Response(content=_HEALTH_TEMPLATE % len(_TASKS), media_type="application/json")
+
+@router.get("/", response_model=dict)
 async def get_tasks(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
@@ -83,21 +120,24 @@ async def get_tasks(
     priority: Optional[str] = Query(None)
 ):
     """Get list of tasks"""
-    print(f"📋 Getting tasks: limit={limit}, offset={offset}, status={status}, priority={priority}")
-    
-    tasks = MOCK_TASKS.copy()
-    
-    # Filter by status
-    if status:
-        tasks = [task for task in tasks if task["status"] == status]
-    
-    # Filter by priority
-    if priority:
-        tasks = [task for task in tasks if task["priority"] == priority]
-    
-    # Apply pagination
-    total = len(tasks)
-    tasks = tasks[offset:offset + limit]
+    logger.debug("Getting tasks: limit=%s offset=%s status=%s priority=%s", limit, offset, status, priority)
+    
+    if not status and not priority:
+        # Không lọc: phân trang trực tiếp trên kho task
+        total = len(_TASKS)
+        tasks = list(islice(_TASKS.values(), offset, offset + limit))
+    else:
+        # Lọc qua chỉ mục, giao hai tập id khi có cả hai điều kiện
+        if status and priority:
+            task_ids = _BY_STATUS.get(status, _NO_IDS) & _BY_PRIORITY.get(priority, _NO_IDS)
+        elif status:
+            task_ids = _BY_STATUS.get(status, _NO_IDS)
+        else:
+            task_ids = _BY_PRIORITY.get(priority, _NO_IDS)
+        
+        # Apply pagination
+        total = len(task_ids)
+        tasks = [_TASKS[task_id] for task_id in islice(sorted(task_ids), offset, offset + limit)]
     
     return {
         "tasks": tasks,
@@ -109,22 +149,24 @@ async def get_tasks(
 @router.post("/", response_model=dict)
 async def create_task(task_data: TaskCreate):
     """Create a new task"""
-    print(f"📝 Creating task: {task_data.title}")
+    logger.debug("Creating task: %s", task_data.title)
     
+    now = datetime.now()
     new_task = {
-        "id": len(MOCK_TASKS) + 1,
+        "id": next(_NEXT_ID),
         "title": task_data.title,
         "description": task_data.description,
         "priority": task_data.priority,
         "status": "todo",
-        "due_date": task_data.due_date.isoformat() if task_data.due_date else None,
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat(),
+        "due_date": task_data.due_date,
+        "created_at": now,
+        "updated_at": now,
         "assignee_id": 1,
         "team_id": 1
     }
     
-    MOCK_TASKS.append(new_task)
+    _TASKS[new_task["id"]] = new_task
+    _index_task(new_task)
     
     return {
         "message": "Task tạo thành công",
@@ -134,9 +176,9 @@ async def create_task(task_data: TaskCreate):
 @router.get("/{task_id}", response_model=dict)
 async def get_task(task_id: int):
     """Get task by ID"""
-    print(f"🔍 Getting task: {task_id}")
+    logger.debug("Getting task: %s", task_id)
     
-    task = next((task for task in MOCK_TASKS if task["id"] == task_id), None)
+    task = _TASKS.get(task_id)
     
     if not task:
         raise HTTPException(status_code=404, detail="Task không tìm thấy")
@@ -146,14 +188,15 @@ async def get_task(task_id: int):
 @router.put("/{task_id}", response_model=dict)
 async def update_task(task_id: int, task_data: TaskUpdate):
     """Update task"""
-    print(f"✏️ Updating task: {task_id}")
+    logger.debug("Updating task: %s", task_id)
     
-    task = next((task for task in MOCK_TASKS if task["id"] == task_id), None)
+    task = _TASKS.get(task_id)
     
     if not task:
         raise HTTPException(status_code=404, detail="Task không tìm thấy")
     
     # Update fields
+    _unindex_task(task)
     if task_data.title is not None:
         task["title"] = task_data.title
     if task_data.description is not None:
@@ -163,9 +206,10 @@ async def update_task(task_id: int, task_data: TaskUpdate):
     if task_data.status is not None:
         task["status"] = task_data.status
     if task_data.due_date is not None:
-        task["due_date"] = task_data.due_date.isoformat()
+        task["due_date"] = task_data.due_date
+    _index_task(task)
     
-    task["updated_at"] = datetime.now().isoformat()
+    task["updated_at"] = datetime.now()
     
     return {
         "message": "Task cập nhật thành công",
@@ -175,26 +219,16 @@ async def update_task(task_id: int, task_data: TaskUpdate):
 @router.delete("/{task_id}", response_model=dict)
 async def delete_task(task_id: int):
     """Delete task"""
-    print(f"🗑️ Deleting task: {task_id}")
+    logger.debug("Deleting task: %s", task_id)
     
-    task_index = next((i for i, task in enumerate(MOCK_TASKS) if task["id"] == task_id), None)
+    deleted_task = _TASKS.pop(task_id, None)
     
-    if task_index is None:
+    if deleted_task is None:
         raise HTTPException(status_code=404, detail="Task không tìm thấy")
     
-    deleted_task = MOCK_TASKS.pop(task_index)
+    _unindex_task(deleted_task)
     
     return {
         "message": "Task xóa thành công",
         "task": deleted_task
-    }
-
-@router.get("/health", response_model=dict)
-async def health_check():
-    """Health check"""
-    return {
-        "status": "healthy",
-        "service": "tasks",
-        "version": "1.0.0",
-        "total_tasks": len(MOCK_TASKS)
     }
\ No newline at end of file
@@ -1,10 +1,12 @@
 """
 Teams API Controller - Quản lý nhóm làm việc
 """
+import logging
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+from itertools import count, islice
 
 # Schemas
 class TeamCreate(BaseModel):
@@ -33,6 +35,7 @@ class TeamMember(BaseModel):
 
 # Router
 router = APIRouter(prefix="/api/v1/teams", tags=["Teams"])
+logger = logging.getLogger(__name__)
 
 # Mock data
 MOCK_TEAMS = [
@@ -83,34 +86,51 @@ MOCK_MEMBERS = [
     }
 ]
 
+# Chỉ mục: team theo id, thành viên theo team và theo (team_id, email)
+MOCK_TEAMS_BY_ID: Dict[int, dict] = {team["id"]: team for team in MOCK_TEAMS}
+MOCK_MEMBERS_BY_TEAM: Dict[int, Dict[int, dict]] = {}
+_MEMBERS_BY_EMAIL: Dict[Tuple[int, str], dict] = {}
+_NEXT_TEAM_ID = count(max(MOCK_TEAMS_BY_ID, default=0) + 1)
+_NEXT_MEMBER_ID = count(max((member["id"] for member in MOCK_MEMBERS), default=0) + 1)
+
+
+def _add_member(member: dict) -> None:
+    """Thêm thành viên vào các chỉ mục"""
+    MOCK_MEMBERS_BY_TEAM.setdefault(member["team_id"], {})[member["id"]] = member
+    _MEMBERS_BY_EMAIL[(member["team_id"], member["email"])] = member
+
+
+for _member in MOCK_MEMBERS:
+    _add_member(_member)
+
+
 @router.get("/", response_model=dict)
 async def get_teams(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0)
 ):
     """Get list of teams"""
-    print(f"👥 Getting teams: limit={limit}, offset={offset}")
-    
-    teams = MOCK_TEAMS.copy()
+    logger.debug("Getting teams: limit=%s offset=%s", limit, offset)
     
-    # Apply pagination
-    total = len(teams)
-    teams = teams[offset:offset + limit]
+    # Apply pagination (dict giữ thứ tự thêm vào)
+    total = len(MOCK_TEAMS_BY_ID)
+    teams = list(islice(MOCK_TEAMS_BY_ID.values(), offset, offset + limit))
     
-    return {
+    result = {
         "teams": teams,
         "total": total,
         "limit": limit,
         "offset": offset
     }
+    return result
 
 @router.post("/", response_model=dict)
 async def create_team(team_data: TeamCreate):
     """Create a new team"""
-    print(f"👥 Creating team: {team_data.name}")
+    logger.debug("Creating team: %s", team_data.name)
     
     new_team = {
-        "id": len(MOCK_TEAMS) + 1,
+        "id": next(_NEXT_TEAM_ID),
         "name": team_data.name,
         "description": team_data.description,
         "created_at": datetime.now().isoformat(),
@@ -119,30 +139,41 @@ async def create_team(team_data: TeamCreate):
         "member_count": 1
     }
     
-    MOCK_TEAMS.append(new_team)
+    MOCK_TEAMS_BY_ID[new_team["id"]] = new_team
     
     # Add owner as member
     new_member = {
-        "id": len(MOCK_MEMBERS) + 1,
+        "id": next(_NEXT_MEMBER_ID),
         "email": "alexnghia1@gmail.com",
         "full_name": "Alex Nghia",
         "role": "owner",
         "joined_at": datetime.now().isoformat(),
         "team_id": new_team["id"]
     }
-    MOCK_MEMBERS.append(new_member)
+    _add_member(new_member)
     
     return {
         "message": "Team tạo thành công",
         "team": new_team
     }
 
+# Khai báo trước /{team_id} để "/health" không bị hiểu là team_id
+@router.get("/health", response_model=dict)
+async def health_check():
+    """Health check"""
+    return {
+        "status": "healthy",
+        "service": "teams",
+        "version": "1.0.0",
+        "total_teams": len(MOCK_TEAMS_BY_ID)
+    }
+
 @router.get("/{team_id}", response_model=dict)
 async def get_team(team_id: int):
     """Get team by ID"""
-    print(f"🔍 Getting team: {team_id}")
+    logger.debug("Getting team: %s", team_id)
     
-    team = next((team for team in MOCK_TEAMS if team["id"] == team_id), None)
+    team = MOCK_TEAMS_BY_ID.get(team_id)
     
     if not team:
         raise HTTPException(status_code=404, detail="Team không tìm thấy")
@@ -152,9 +183,9 @@ async def get_team(team_id: int):
 @router.put("/{team_id}", response_model=dict)
 async def update_team(team_id: int, team_data: TeamUpdate):
     """Update team"""
-    print(f"✏️ Updating team: {team_id}")
+    logger.debug("Updating team: %s", team_id)
     
-    team = next((team for team in MOCK_TEAMS if team["id"] == team_id), None)
+    team = MOCK_TEAMS_BY_ID.get(team_id)
     
     if not team:
         raise HTTPException(status_code=404, detail="Team không tìm thấy")
@@ -175,36 +206,34 @@ async def update_team(team_id: int, team_data: TeamUpdate):
 @router.get("/{team_id}/members", response_model=dict)
 async def get_team_members(team_id: int):
     """Get team members"""
-    print(f"👤 Getting members for team: {team_id}")
+    logger.debug("Getting members for team: %s", team_id)
     
-    team = next((team for team in MOCK_TEAMS if team["id"] == team_id), None)
+    team = MOCK_TEAMS_BY_ID.get(team_id)
     
     if not team:
         raise HTTPException(status_code=404, detail="Team không tìm thấy")
     
-    members = [member for member in MOCK_MEMBERS if member.get("team_id") == team_id]
+    members = list(MOCK_MEMBERS_BY_TEAM.get(team_id, {}).values())
     
-    return {
+    result = {
         "team_id": team_id,
         "members": members,
         "total": len(members)
     }
+    return result
 
 @router.post("/{team_id}/invite", response_model=dict)
 async def invite_member(team_id: int, email: str):
     """Invite member to team"""
-    print(f"📧 Inviting {email} to team: {team_id}")
+    logger.debug("Inviting %s to team: %s", email, team_id)
     
-    team = next((team for team in MOCK_TEAMS if team["id"] == team_id), None)
+    team = MOCK_TEAMS_BY_ID.get(team_id)
     
     if not team:
         raise HTTPException(status_code=404, detail="Team không tìm thấy")
     
     # Check if already member
-    existing_member = next((member for member in MOCK_MEMBERS 
-                          if member["email"] == email and member.get("team_id") == team_id), None)
-    
-    if existing_member:
+    if (team_id, email) in _MEMBERS_BY_EMAIL:
         raise HTTPException(status_code=400, detail="User đã là thành viên của team")
     
     return {
@@ -216,30 +245,18 @@ async def invite_member(team_id: int, email: str):
 @router.delete("/{team_id}", response_model=dict)
 async def delete_team(team_id: int):
     """Delete team"""
-    print(f"🗑️ Deleting team: {team_id}")
+    logger.debug("Deleting team: %s", team_id)
     
-    team_index = next((i for i, team in enumerate(MOCK_TEAMS) if team["id"] == team_id), None)
+    deleted_team = MOCK_TEAMS_BY_ID.pop(team_id, None)
     
-    if team_index is None:
+    if deleted_team is None:
         raise HTTPException(status_code=404, detail="Team không tìm thấy")
     
-    deleted_team = MOCK_TEAMS.pop(team_index)
-    
     # Remove all members
-    global MOCK_MEMBERS
-    MOCK_MEMBERS = [member for member in MOCK_MEMBERS if member.get("team_id") != team_id]
+    for member in MOCK_MEMBERS_BY_TEAM.pop(team_id, {}).values():
+        _MEMBERS_BY_EMAIL.pop((team_id, member["email"]), None)
     
     return {
         "message": "Team xóa thành công",
         "team": deleted_team
     }
-
-@router.get("/health", response_model=dict)
-async def health_check():
-    """Health check"""
-    return {
-        "status": "healthy",
-        "service": "teams",
-        "version": "1.0.0",
-        "total_teams": len(MOCK_TEAMS)
-    }
\ No newline at end of file
@@ -3,15 +3,44 @@ Cấu hình cơ sở dữ liệu SQLite sử dụng SQLAlchemy
 Quản lý kết nối và session database
 """
 
-from sqlalchemy import create_engine, inspect, text
+import json
+import logging
+import secrets
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, create_engine, delete, exists, inspect, select, text
+from sqlalchemy.dialects.sqlite import DATETIME as SQLITE_DATETIME
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, StaticPool
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
+# Cấu hình pool kết nối: SQLite in-memory dùng chung một kết nối (StaticPool),
+# đứng sau PgBouncer thì để PgBouncer giữ kết nối (NullPool), còn lại dùng
+# QueuePool đủ lớn và kiểm tra kết nối trước khi dùng (xem db_* trong config)
+if settings.database_url in ("sqlite://", "sqlite:///:memory:"):
+    pool_kwargs = {"poolclass": StaticPool}
+elif settings.db_use_pgbouncer:
+    pool_kwargs = {"poolclass": NullPool}
+else:
+    pool_kwargs = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+# check_same_thread chỉ cần thiết (và chỉ hợp lệ) cho SQLite
+connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
+
 # Tạo engine kết nối cơ sở dữ liệu
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False}  # Chỉ cần thiết cho SQLite
+    connect_args=connect_args,
+    **pool_kwargs
 )
 
 # Tạo SessionLocal class để tạo session instances
@@ -20,6 +49,16 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Tạo Base class cho các models
 Base = declarative_base()
 
+# Kiểu cột created_at của các bảng phân trang keyset theo (created_at, id). SQLite so sánh
+# thời gian dưới dạng chuỗi và server_default CURRENT_TIMESTAMP lưu 'YYYY-MM-DD HH:MM:SS':
+# giá trị ghi từ Python (và giá trị trong cursor) cũng được lưu/bind đúng định dạng đó
+CreatedAt = DateTime(timezone=True).with_variant(
+    SQLITE_DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite"
+)
+
 
 def get_db():
     """
@@ -33,11 +72,59 @@ def get_db():
         db.close()
 
 
+# Đánh dấu đã kiểm tra schema trong process này (tránh chạy lại các truy vấn PRAGMA)
+_schema_checked = False
+
+# Bảng ghi tên các bước chuyển đổi dữ liệu một lần đã chạy xong, để các lần khởi động
+# sau không phải quét toàn bảng chỉ để thấy không còn gì cần sửa
+_MIGRATIONS_TABLE = "schema_migrations"
+
+
+def _applied_migrations() -> set:
+    """
+    Lấy tên các bước chuyển đổi dữ liệu đã chạy (tạo bảng đánh dấu nếu chưa có)
+    
+    Returns:
+        set: Tên các bước đã chạy
+    """
+    with engine.begin() as connection:
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {_MIGRATIONS_TABLE} (name VARCHAR(100) PRIMARY KEY)"
+        ))
+        return set(connection.execute(text(f"SELECT name FROM {_MIGRATIONS_TABLE}")).scalars())
+
+
+def _run_migration(name: str, statements) -> None:
+    """
+    Chạy một bước chuyển đổi dữ liệu và ghi dấu trong cùng transaction
+    
+    Args:
+        name: Tên bước (khóa trong bảng đánh dấu)
+        statements: Hàm nhận connection và thực hiện chuyển đổi
+    """
+    try:
+        with engine.begin() as connection:
+            statements(connection)
+            connection.execute(
+                text(f"INSERT INTO {_MIGRATIONS_TABLE} (name) VALUES (:name)"), {"name": name}
+            )
+    except IntegrityError:
+        # Worker khác vừa chạy xong cùng bước này: các câu lệnh đều idempotent nên bỏ qua
+        pass
+
+
 def ensure_schema():
-    """Đảm bảo schema mới nhất cho cơ sở dữ liệu hiện có"""
+    """Đảm bảo schema mới nhất cho cơ sở dữ liệu hiện có (chỉ chạy một lần mỗi process)"""
+    global _schema_checked
+    if _schema_checked:
+        return
+    _schema_checked = True
+
     inspector = inspect(engine)
+    table_names = inspector.get_table_names()
+    applied = _applied_migrations()
 
-    if "teams" in inspector.get_table_names():
+    if "teams" in table_names:
         existing_columns = {col["name"] for col in inspector.get_columns("teams")}
 
         statements = []
@@ -52,12 +139,113 @@ def ensure_schema():
                     connection.execute(text(statement))
 
         if "invite_code" not in existing_columns:
-            from .models.team import Team  # Avoid circular import
+            # Backfill invite code bằng một executemany thay vì flush từng team qua ORM
+            # (cùng định dạng với Team.generate_invite_code)
+            with engine.begin() as connection:
+                team_ids = connection.execute(
+                    text("SELECT id FROM teams WHERE invite_code IS NULL")
+                ).scalars().all()
+                if team_ids:
+                    connection.execute(
+                        text("UPDATE teams SET invite_code = :code WHERE id = :team_id"),
+                        [{"team_id": team_id, "code": secrets.token_urlsafe(12)} for team_id in team_ids]
+                    )
+
+    # backup_codes trước đây lưu chuỗi hash nối bằng dấu phẩy, nay là mảng JSON
+    if "users" in table_names and "backup_codes_json" not in applied:
+
+        def backup_codes_json(connection):
+            rows = connection.execute(text(
+                "SELECT id, backup_codes FROM users "
+                "WHERE backup_codes IS NOT NULL AND backup_codes NOT LIKE '[%'"
+            )).all()
+            if rows:
+                connection.execute(
+                    text("UPDATE users SET backup_codes = :codes WHERE id = :user_id"),
+                    [{"user_id": row.id, "codes": json.dumps(row.backup_codes.split(","))} for row in rows]
+                )
+
+        _run_migration("backup_codes_json", backup_codes_json)
+
+    # Cột enum trước đây lưu tên enum (PENDING, TASK_ASSIGNED...), nay lưu giá trị chữ thường
+    if "lowercase_enum_values" not in applied:
+        enum_columns = {"tasks": ("status", "priority"), "notifications": ("notification_type", "priority")}
+
+        def lowercase_enum_values(connection):
+            for table_name, columns in enum_columns.items():
+                if table_name not in table_names:
+                    continue
+                for column in columns:
+                    connection.execute(text(
+                        f"UPDATE {table_name} SET {column} = lower({column}) "
+                        f"WHERE {column} IS NOT NULL AND {column} != lower({column})"
+                    ))
 
-            session = SessionLocal()
+        _run_migration("lowercase_enum_values", lowercase_enum_values)
+
+    # create_all không thêm index mới cho bảng đã tồn tại: tạo các index còn thiếu
+    # (ix_users_email, các composite index cho notification/otp/invitation, ...)
+    inspector = inspect(engine)
+    for table_name in table_names:
+        table = Base.metadata.tables.get(table_name)
+        if table is None:
+            continue
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table_name)}
+        existing_columns = {col["name"] for col in inspector.get_columns(table_name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            if not all(column.name in existing_columns for column in index.columns):
+                continue
             try:
-                for team in session.query(Team).filter(Team.invite_code.is_(None)).all():
-                    team.generate_invite_code()
-                session.commit()
-            finally:
-                session.close()
\ No newline at end of file
+                with engine.begin() as connection:
+                    index.create(bind=connection)
+            except IntegrityError:
+                # Dữ liệu cũ vi phạm unique index: bỏ qua để app vẫn khởi động được
+                logger.warning("Không thể tạo unique index %s do dữ liệu trùng lặp", index.name)
+
+
+def cleanup_unverified_users(max_age: timedelta = timedelta(days=1), batch_size: int = 1000) -> int:
+    """
+    Xóa các tài khoản đăng ký bỏ dở (chưa xác thực, OTP đã hết hạn quá max_age)
+    Xóa theo từng lô để không giữ khóa bảng users lâu; bỏ qua user còn được bảng khác
+    tham chiếu (task, team, invitation, notification...) để không vi phạm khóa ngoại
+    
+    Args:
+        max_age: Thời gian giữ lại sau khi OTP hết hạn
+        batch_size: Số dòng tối đa xóa trong một transaction
+        
+    Returns:
+        int: Tổng số tài khoản đã xóa
+    """
+    from .models.user import User
+
+    # NOT EXISTS cho mọi khóa ngoại trỏ tới users.id, lấy từ metadata của các model
+    not_referenced = [
+        ~exists().where(fk.parent == User.id)
+        for table in Base.metadata.sorted_tables
+        for fk in table.foreign_keys
+        if fk.column.table.name == "users" and table.name != "users"
+    ]
+    cutoff = datetime.utcnow() - max_age
+    batch = delete(User).where(User.id.in_(
+        select(User.id)
+        .where(User.is_verified == False, User.email_otp_expiry < cutoff, *not_referenced)
+        .limit(batch_size)
+        .correlate(None)
+    ))
+    total = 0
+    while True:
+        try:
+            with engine.begin() as connection:
+                deleted = connection.execute(batch).rowcount
+        except IntegrityError:
+            # Tham chiếu từ bảng ngoài metadata: dừng lần dọn này thay vì lỗi lặp lại
+            logger.warning("Không thể xóa tài khoản chưa xác thực do còn dữ liệu tham chiếu", exc_info=True)
+            break
+        total += deleted
+        if deleted < batch_size:
+            break
+    if total:
+        logger.info("Đã xóa %d tài khoản chưa xác thực", total)
+    return total
@@ -5,23 +5,78 @@ Kiểm tra JWT token và phân quyền truy cập
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, raiseload
 from typing import Optional
 from ..database import get_db
 from ..models.user import User
-from ..utils.auth import verify_token
-from ..schemas import TokenData
+from ..utils.auth import get_token_subject
 
 # Khởi tạo HTTPBearer để lấy token từ header
 security = HTTPBearer()
 
+def _credentials_exception() -> HTTPException:
+    """
+    Tạo exception cho trường hợp token không hợp lệ
+    Mỗi lần raise dùng một instance mới: nhiều thread cùng raise một instance dùng chung
+    sẽ ghi đè __traceback__/__context__ của nhau
+    
+    Returns:
+        HTTPException: Lỗi 401 kèm header WWW-Authenticate
+    """
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Không thể xác thực thông tin đăng nhập",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+# User hiện tại không nạp quan hệ (teams, tasks...) theo mặc định: truy cập quan hệ
+# ngoài ý muốn sẽ báo lỗi thay vì lazy-load thêm truy vấn cho mỗi request
+_NO_RELATIONSHIPS = (raiseload("*"),)
+
 
-async def get_current_user(
+def _parse_user_id(subject: Optional[str]) -> Optional[int]:
+    """Chuyển subject của token thành user_id, None nếu không hợp lệ"""
+    if subject is None:
+        return None
+    try:
+        return int(subject)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_current_user_id(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> int:
+    """
+    Dependency lấy user_id từ JWT token, không truy vấn database
+    
+    Args:
+        credentials: Authorization credentials từ header
+        
+    Returns:
+        int: ID của user trong token
+        
+    Raises:
+        HTTPException: Nếu token không hợp lệ
+    """
+    # Verify token (có cache) và lấy user_id từ subject
+    user_id = _parse_user_id(get_token_subject(credentials.credentials))
+    if user_id is None:
+        raise _credentials_exception()
+    return user_id
+
+
+def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
     """
     Dependency để lấy thông tin user hiện tại từ JWT token
+    Khai báo def (không async) để FastAPI chạy truy vấn DB đồng bộ trong threadpool,
+    tránh chặn event loop. User chỉ có các cột (backup_codes nạp khi truy cập); quan hệ
+    teams/team_memberships/tasks bị raiseload, endpoint nào cần phải tự truy vấn tường minh
     
     Args:
         credentials: Authorization credentials từ header
@@ -33,33 +88,12 @@ async def get_current_user(
     Raises:
         HTTPException: Nếu token không hợp lệ hoặc user không tồn tại
     """
-    # Exception cho trường hợp token không hợp lệ
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Không thể xác thực thông tin đăng nhập",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        # Verify và decode token
-        payload = verify_token(credentials.credentials)
-        if payload is None:
-            raise credentials_exception
-            
-        # Lấy user_id từ payload
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-            
-        token_data = TokenData(user_id=user_id)
-        
-    except Exception:
-        raise credentials_exception
+    user_id = get_current_user_id(credentials)
     
     # Tìm user trong database
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user = db.get(User, user_id, options=_NO_RELATIONSHIPS)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
         
     # Kiểm tra user có active không
     if not user.is_active:
@@ -97,13 +131,14 @@ async def get_current_active_user(
 # Loại bỏ get_current_team_manager dependency vì mọi user đều có thể tạo team
 
 
-async def get_optional_current_user(
+def get_optional_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db)
 ) -> Optional[User]:
     """
     Dependency để lấy user hiện tại (optional)
     Không raise exception nếu không có token
+    Chạy trong threadpool như get_current_user vì truy vấn DB đồng bộ
     
     Args:
         credentials: Authorization credentials (optional)
@@ -116,18 +151,14 @@ async def get_optional_current_user(
         return None
     
     try:
-        payload = verify_token(credentials.credentials)
-        if payload is None:
-            return None
-            
-        user_id: int = payload.get("sub")
+        user_id = _parse_user_id(get_token_subject(credentials.credentials))
         if user_id is None:
             return None
         
-        user = db.query(User).filter(
+        user = db.scalar(select(User).options(*_NO_RELATIONSHIPS).where(
             User.id == user_id,
             User.is_active == True
-        ).first()
+        ))
         
         return user
         
@@ -163,6 +194,8 @@ class PermissionChecker:
     Class để kiểm tra các quyền phức tạp
     """
     
+    __slots__ = ("required_role",)
+    
     def __init__(self, required_role: str = None):
         self.required_role = required_role
     
@@ -2,7 +2,7 @@
 Model Invitation - Lưu trữ lời mời tham gia nhóm
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -22,5 +22,16 @@ class Invitation(Base):
     team = relationship("Team")
     inviter = relationship("User")
 
+    __table_args__ = (
+        # Kiểm tra lời mời trùng theo team + email
+        Index("ix_inv_team_email", "team_id", "email"),
+        # Lời mời đang chờ của một email (partial index trên SQLite/PostgreSQL)
+        Index(
+            "ix_inv_pending", "email",
+            sqlite_where=is_accepted == False,
+            postgresql_where=is_accepted == False
+        ),
+    )
+
     def __repr__(self):
         return f"<Invitation(email={self.email}, team_id={self.team_id}, invited_by={self.invited_by})>"
@@ -3,14 +3,15 @@ Model Notification - Quản lý thông báo cho người dùng
 Hỗ trợ thông báo real-time và lưu trữ lịch sử
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Index, CheckConstraint
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
+from datetime import datetime
 from enum import Enum as PyEnum
-from ..database import Base
+from ..database import Base, CreatedAt
 
 
-class NotificationTypeEnum(PyEnum):
+class NotificationTypeEnum(str, PyEnum):
     """Enum cho các loại thông báo"""
     TASK_ASSIGNED = "task_assigned"
     TASK_UPDATED = "task_updated"
@@ -22,7 +23,7 @@ class NotificationTypeEnum(PyEnum):
     COMMENT_ADDED = "comment_added"
 
 
-class NotificationPriorityEnum(PyEnum):
+class NotificationPriorityEnum(str, PyEnum):
     """Enum cho mức độ ưu tiên thông báo"""
     LOW = "low"
     NORMAL = "normal"
@@ -37,6 +38,21 @@ class Notification(Base):
     """
     
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Thông báo (chưa đọc) của user, sắp xếp theo created_at
+        Index("ix_notif_user_unread", "user_id", "is_read", "created_at"),
+        # Phân trang keyset thông báo của user theo (created_at, id)
+        Index("ix_notif_user_created_id", "user_id", "created_at", "id"),
+        # Lưu giá trị enum dạng chuỗi, DB kiểm tra miền giá trị
+        CheckConstraint(
+            "notification_type IN (%s)" % ", ".join(f"'{item.value}'" for item in NotificationTypeEnum),
+            name="ck_notifications_type"
+        ),
+        CheckConstraint(
+            "priority IN (%s)" % ", ".join(f"'{item.value}'" for item in NotificationPriorityEnum),
+            name="ck_notifications_priority"
+        ),
+    )
 
     # Khóa chính
     id = Column(Integer, primary_key=True, index=True)
@@ -47,11 +63,11 @@ class Notification(Base):
     # Nội dung thông báo
     title = Column(String(255), nullable=False)
     message = Column(Text, nullable=False)
-    notification_type = Column(Enum(NotificationTypeEnum), nullable=False)
-    priority = Column(Enum(NotificationPriorityEnum), default=NotificationPriorityEnum.NORMAL)
+    notification_type = Column(String(32), nullable=False)
+    priority = Column(String(16), default=NotificationPriorityEnum.NORMAL.value)
     
     # Metadata
-    data = Column(Text)  # JSON string chứa dữ liệu bổ sung
+    data = deferred(Column(Text))  # JSON string chứa dữ liệu bổ sung (chỉ nạp khi truy cập)
     action_url = Column(String(500))  # URL để thực hiện hành động
     
     # Trạng thái
@@ -63,7 +79,7 @@ class Notification(Base):
     related_team_id = Column(Integer, ForeignKey("teams.id"), nullable=True)
     
     # Thời gian
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(CreatedAt, server_default=func.now())
     read_at = Column(DateTime(timezone=True))
     sent_at = Column(DateTime(timezone=True))
     
@@ -78,23 +94,9 @@ class Notification(Base):
     def mark_as_read(self):
         """Đánh dấu thông báo đã đọc"""
         self.is_read = True
-        self.read_at = func.now()
+        self.read_at = datetime.utcnow()
     
     def mark_as_sent(self):
         """Đánh dấu thông báo đã gửi"""
         self.is_sent = True
-        self.sent_at = func.now()
-    
-    def to_dict(self):
-        """Chuyển đổi thành dict cho JSON response"""
-        return {
-            "id": self.id,
-            "title": self.title,
-            "message": self.message,
-            "type": self.notification_type.value,
-            "priority": self.priority.value,
-            "is_read": self.is_read,
-            "action_url": self.action_url,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "read_at": self.read_at.isoformat() if self.read_at else None,
-        }
\ No newline at end of file
+        self.sent_at = datetime.utcnow()
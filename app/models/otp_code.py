@@ -3,7 +3,8 @@ Model OTPCode - Quản lý mã OTP cho xác thực email
 Hỗ trợ OTP cho đăng ký và reset password
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -16,6 +17,10 @@ class OTPCode(Base):
     """
     
     __tablename__ = "otp_codes"
+    __table_args__ = (
+        # Tra OTP còn hiệu lực theo email + loại
+        Index("ix_otp_lookup", "email", "otp_type", "is_used", "expires_at"),
+    )
 
     # Thông tin cơ bản
     id = Column(Integer, primary_key=True, index=True)
@@ -39,7 +44,6 @@ class OTPCode(Base):
     
     def is_expired(self):
         """Kiểm tra OTP đã hết hạn chưa"""
-        from datetime import datetime
         return datetime.utcnow() > self.expires_at
     
     def is_valid(self):
@@ -3,23 +3,23 @@ Model Task - Quản lý công việc trong Todo List
 Hỗ trợ gán task cho team member và theo dõi trạng thái
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from ..database import Base
+from ..database import Base, CreatedAt
 import enum
 
 
-class TaskStatus(enum.Enum):
-    """Enum định nghĩa trạng thái của task"""
+class TaskStatus(str, enum.Enum):
+    """Enum định nghĩa trạng thái của task (kế thừa str để so sánh trực tiếp với giá trị cột)"""
     PENDING = "pending"         # Đang chờ
     IN_PROGRESS = "in_progress" # Đang thực hiện
     COMPLETED = "completed"     # Hoàn thành
     CANCELLED = "cancelled"     # Đã hủy
 
 
-class TaskPriority(enum.Enum):
-    """Enum định nghĩa độ ưu tiên của task"""
+class TaskPriority(str, enum.Enum):
+    """Enum định nghĩa độ ưu tiên của task (kế thừa str để so sánh trực tiếp với giá trị cột)"""
     LOW = "low"         # Thấp
     MEDIUM = "medium"   # Trung bình
     HIGH = "high"       # Cao
@@ -33,6 +33,19 @@ class Task(Base):
     """
     
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Lưu giá trị enum dạng chuỗi, DB kiểm tra miền giá trị
+        CheckConstraint(
+            "status IN (%s)" % ", ".join(f"'{item.value}'" for item in TaskStatus),
+            name="ck_tasks_status"
+        ),
+        CheckConstraint(
+            "priority IN (%s)" % ", ".join(f"'{item.value}'" for item in TaskPriority),
+            name="ck_tasks_priority"
+        ),
+        # Phân trang keyset danh sách tasks theo (created_at, id)
+        Index("ix_tasks_created_id", "created_at", "id"),
+    )
 
     # Thông tin cơ bản
     id = Column(Integer, primary_key=True, index=True)
@@ -40,14 +53,14 @@ class Task(Base):
     description = Column(Text)
     
     # Trạng thái và độ ưu tiên
-    status = Column(Enum(TaskStatus), default=TaskStatus.PENDING, index=True)
-    priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM, index=True)
+    status = Column(String(20), default=TaskStatus.PENDING.value, index=True)
+    priority = Column(String(20), default=TaskPriority.MEDIUM.value, index=True)
     
     # Thời gian
     start_date = Column(DateTime(timezone=True))
     due_date = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(CreatedAt, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Quan hệ với User
@@ -63,7 +76,7 @@ class Task(Base):
     team = relationship("Team", back_populates="tasks")
     
     def __repr__(self):
-        return f"<Task(id={self.id}, title='{self.title}', status='{self.status.value}')>"
+        return f"<Task(id={self.id}, title='{self.title}', status='{self.status}')>"
     
     def is_overdue(self) -> bool:
         """Kiểm tra xem task có quá hạn không"""
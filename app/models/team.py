@@ -3,10 +3,10 @@ Model Team và TeamMember - Quản lý nhóm và thành viên
 Hỗ trợ phân quyền team manager và team member
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Index, select
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
-import uuid
+import secrets
 from ..database import Base
 
 
@@ -47,8 +47,8 @@ class Team(Base):
         return f"<Team(id={self.id}, name='{self.name}', manager_id={self.manager_id})>"
     
     def get_member_count(self) -> int:
-        """Lấy số lượng thành viên hiện tại"""
-        return len([m for m in self.members if m.is_active])
+        """Lấy số lượng thành viên hiện tại (COUNT trong SQL, không nạp members)"""
+        return self.member_count
     
     def can_add_member(self) -> bool:
         """Kiểm tra xem có thể thêm thành viên mới không"""
@@ -59,8 +59,8 @@ class Team(Base):
         return self.manager_id == user_id
     
     def generate_invite_code(self) -> str:
-        """Tạo mã mời tham gia team"""
-        self.invite_code = str(uuid.uuid4()).replace('-', '')[:16]
+        """Tạo mã mời tham gia team (16 ký tự URL-safe từ 12 byte ngẫu nhiên)"""
+        self.invite_code = secrets.token_urlsafe(12)
         return self.invite_code
     
     def get_invite_link(self, base_url: str = "http://localhost:8000") -> str:
@@ -97,9 +97,30 @@ class TeamMember(Base):
     team = relationship("Team", back_populates="members")
     user = relationship("User", back_populates="team_memberships")
     
+    __table_args__ = (
+        # Mỗi user chỉ có một membership đang hoạt động trong một team (DB tự chặn trùng)
+        Index(
+            "ux_team_members_active", "team_id", "user_id",
+            unique=True,
+            sqlite_where=is_active == True,
+            postgresql_where=is_active == True
+        ),
+    )
+    
     def __repr__(self):
         return f"<TeamMember(team_id={self.team_id}, user_id={self.user_id}, role='{self.role}')>"
     
     def can_manage_tasks(self) -> bool:
         """Kiểm tra xem member có thể quản lý tasks không"""
-        return self.role in ["deputy", "lead"] or self.user.is_team_manager()
\ No newline at end of file
+        return self.role in ["deputy", "lead"] or self.user.is_team_manager()
+
+
+# Số thành viên đang hoạt động, tính bằng subquery COUNT.
+# deferred: chỉ chạy khi truy cập, hoặc nạp cùng query với undefer(Team.member_count)
+Team.member_count = column_property(
+    select(func.count(TeamMember.id))
+    .where(TeamMember.team_id == Team.id, TeamMember.is_active == True)
+    .correlate_except(TeamMember)
+    .scalar_subquery(),
+    deferred=True
+)
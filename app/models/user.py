@@ -3,8 +3,9 @@ Model User - Quản lý thông tin người dùng
 Bao gồm chức năng 2FA và phân quyền team manager/member
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import JSON, Column, Integer, String, DateTime, Boolean, Index, exists
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import column_property, deferred, relationship
 from sqlalchemy.sql import func
 from ..database import Base
 
@@ -32,7 +33,11 @@ class User(Base):
     # Thông tin 2FA
     totp_secret = Column(String(100))  # Secret key cho Google Authenticator
     is_2fa_enabled = Column(Boolean, default=False)
-    backup_codes = Column(Text)  # Mã backup cho 2FA (JSON string)
+    # Danh sách hash mã backup cho 2FA (JSON, JSONB trên PostgreSQL; None lưu là NULL).
+    # deferred: cột lớn nhất của bảng, không nạp mỗi lần lấy current user
+    backup_codes = deferred(
+        Column(JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"))
+    )
     
     # OTP cho email verification
     email_otp = Column(String(10))
@@ -48,6 +53,27 @@ class User(Base):
     team_memberships = relationship("TeamMember", back_populates="user")
     tasks = relationship("Task", back_populates="assignee", foreign_keys="Task.assignee_id")
     created_tasks = relationship("Task", back_populates="creator", foreign_keys="Task.creator_id")
+
+    # Index phủ (PostgreSQL) cho truy vấn đăng nhập theo email: INCLUDE các cột
+    # xác thực (khớp load_only trong AuthController) để index-only scan, không
+    # phải đọc cả dòng gồm backup_codes. SQLite không hỗ trợ INCLUDE và luôn
+    # chọn ix_users_email (unique) nên bỏ qua index này khi không phải PostgreSQL.
+    __table_args__ = (
+        Index(
+            "ix_users_email_covering",
+            email,
+            postgresql_include=[
+                "id", "hashed_password", "is_active", "is_verified", "is_2fa_enabled",
+                "totp_secret", "email_otp", "email_otp_expiry"
+            ]
+        ).ddl_if(dialect="postgresql"),
+        # Tài khoản chưa xác thực theo hạn OTP: phục vụ job dọn đăng ký bỏ dở
+        Index(
+            "ix_users_unverified_otp_expiry", email_otp_expiry,
+            sqlite_where=is_verified == False,
+            postgresql_where=is_verified == False
+        ),
+    )
     
     def __repr__(self):
         return f"<User(id={self.id}, email='{self.email}')>"
@@ -61,9 +87,28 @@ class User(Base):
         return self.is_active
     
     def is_team_manager(self) -> bool:
-        """Kiểm tra user có quản lý ít nhất một team đang hoạt động không"""
-        return any(team.is_active for team in self.teams if team.manager_id == self.id)
+        """Kiểm tra user có quản lý ít nhất một team đang hoạt động không (EXISTS trong SQL)"""
+        return self.manages_active_team
 
     def is_team_member(self) -> bool:
-        """Kiểm tra user có đang là thành viên của bất kỳ team nào không"""
-        return any(membership.is_active for membership in self.team_memberships)
\ No newline at end of file
+        """Kiểm tra user có đang là thành viên của bất kỳ team nào không (EXISTS trong SQL)"""
+        return self.has_active_membership
+
+
+# Quyền manager/member kiểm tra bằng EXISTS thay vì nạp User.teams / User.team_memberships
+# chỉ để duyệt. Khai báo sau class vì cần Team/TeamMember (team.py không import user.py).
+# deferred: chỉ chạy khi được truy cập
+from .team import Team, TeamMember  # noqa: E402
+
+User.manages_active_team = column_property(
+    exists()
+    .where(Team.manager_id == User.id, Team.is_active == True)
+    .correlate_except(Team),
+    deferred=True
+)
+User.has_active_membership = column_property(
+    exists()
+    .where(TeamMember.user_id == User.id, TeamMember.is_active == True)
+    .correlate_except(TeamMember),
+    deferred=True
+)
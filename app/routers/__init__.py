@@ -1,9 +1,14 @@
 """
-Routers package - Export available routers
+Routers package
+
+Các router được main.py include (mỗi prefix chỉ có một module):
+- auth: /api/v1/auth (router auth duy nhất, gọi AuthController)
+- tasks: /api/v1/tasks
+- teams: /api/v1/teams
+- invitations: /api/v1/invitations
+
+notifications chưa được include. Package không import sẵn router nào:
+main.py import trực tiếp từng module cần dùng.
 """
 
-try:
-    from . import tasks, teams, notifications
-    __all__ = ["tasks", "teams", "notifications"]
-except ImportError:
-    __all__ = []
\ No newline at end of file
+__all__ = ["auth", "tasks", "teams", "invitations", "notifications"]
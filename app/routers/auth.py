@@ -9,7 +9,9 @@ Authentifrom ..schemas import (
 Gộp logic từ router cũ, chuẩn hóa prefix /api/v1/auth và đặt tên endpoint
 phù hợp với frontend hiện tại (register, verify-otp, resend-otp, login, me, ...)
 """
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Request, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List
 
@@ -23,94 +25,88 @@ from ..schemas import (
 from ..controllers.auth_controller import AuthController
 from ..middleware.auth import get_current_user
 
-router = APIRouter(prefix="/api/v1/auth", tags=["Authentication"])
+router = APIRouter(prefix="/api/v1/auth", tags=["Authentication"], default_response_class=ORJSONResponse)
 
 auth_controller = AuthController()
 
+# Các cột của UserResponse cho danh sách users
+_USER_PROFILE_SELECT = select(*(getattr(User, field) for field in UserResponse.model_fields))
+
 
 # ---- Registration & Email Verification ----
 @router.post("/register", response_model=Message, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    result = await auth_controller.register_user(user_data, db)
+def register(user_data: UserCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    result = auth_controller.register_user(user_data, db, background_tasks)
     return Message(message=result["message"])
 
 
 @router.post("/verify-email", response_model=Message)
-async def verify_email(verify_data: EmailOTPVerify, db: Session = Depends(get_db)):
-    result = await auth_controller.verify_email(verify_data, db)
+def verify_email(verify_data: EmailOTPVerify, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    result = auth_controller.verify_email(verify_data, db, background_tasks)
     return Message(message=result["message"])
 
 
 # Alias cho frontend đang gọi /verify-otp
 @router.post("/verify-otp", response_model=Message)
-async def verify_email_alias(otp_data: OTPVerify, db: Session = Depends(get_db)):
+def verify_email_alias(otp_data: OTPVerify, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     verify_payload = EmailOTPVerify(email=otp_data.email, otp_code=otp_data.otp_code)
-    result = await auth_controller.verify_email(verify_payload, db)
+    result = auth_controller.verify_email(verify_payload, db, background_tasks)
     return Message(message=result["message"])
 
 
 @router.post("/resend-registration-otp", response_model=Message)
-async def resend_registration_otp(email_req: EmailOTPRequest, db: Session = Depends(get_db)):
-    result = await auth_controller.resend_registration_otp(email_req, db)
+def resend_registration_otp(email_req: EmailOTPRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    result = auth_controller.resend_registration_otp(email_req, db, background_tasks)
     return Message(message=result["message"])
 
 
 # Alias cho /resend-otp nếu FE dùng
 @router.post("/resend-otp", response_model=Message)
-async def resend_registration_otp_alias(email_req: EmailOTPRequest, db: Session = Depends(get_db)):
-    result = await auth_controller.resend_registration_otp(email_req, db)
+def resend_registration_otp_alias(email_req: EmailOTPRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    result = auth_controller.resend_registration_otp(email_req, db, background_tasks)
     return Message(message=result["message"])
 
 
 
 # ---- Login flows ----
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    result = await auth_controller.login_user(user_credentials, db)
-    return Token(
-        access_token=result["access_token"],
-        token_type=result["token_type"],
-        expires_in=result["expires_in"]
-    )
+def login(user_credentials: UserLogin, request: Request, db: Session = Depends(get_db)):
+    client_host = request.client.host if request.client else None
+    return auth_controller.login_user(user_credentials, db, client_host)
 
 
 # Optional: OTP login (giữ lại nếu cần về sau)
 @router.post("/login-otp", response_model=Token)
-async def login_with_otp(otp_data: EmailOTPVerify, db: Session = Depends(get_db)):
-    result = await auth_controller.login_with_otp(otp_data, db)
-    return Token(
-        access_token=result["access_token"],
-        token_type=result["token_type"],
-        expires_in=result["expires_in"]
-    )
+def login_with_otp(otp_data: EmailOTPVerify, db: Session = Depends(get_db)):
+    return auth_controller.login_with_otp(otp_data, db)
 
 
 # ---- 2FA ----
 @router.post("/enable-2fa", response_model=Dict[str, Any])
-async def enable_2fa(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return await auth_controller.enable_2fa(current_user, db)
+def enable_2fa(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    return auth_controller.enable_2fa(current_user, db)
 
 
 @router.post("/verify-2fa", response_model=Message)
-async def verify_and_enable_2fa(verify_data: Verify2FA, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    result = await auth_controller.verify_and_enable_2fa(verify_data, current_user, db)
+def verify_and_enable_2fa(verify_data: Verify2FA, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    result = auth_controller.verify_and_enable_2fa(verify_data, current_user, db)
     return Message(message=result["message"])
 
 
 @router.post("/disable-2fa", response_model=Message)
-async def disable_2fa(verify_data: Verify2FA, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    result = await auth_controller.disable_2fa(verify_data, current_user, db)
+def disable_2fa(verify_data: Verify2FA, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    result = auth_controller.disable_2fa(verify_data, current_user, db)
     return Message(message=result["message"])
 
 
 # ---- Profile ----
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: User = Depends(get_current_user)):
     return auth_controller.get_user_profile(current_user)
 
 
 @router.put("/me", response_model=UserResponse)
-async def update_me(
+def update_me(
     update_data: UserUpdate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -130,7 +126,7 @@ async def update_me(
 
 
 @router.post("/change-password", response_model=Message)
-async def change_password(
+def change_password(
     password_data: PasswordChange,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -146,12 +142,12 @@ async def change_password(
     Returns:
         Message: Thông báo thành công
     """
-    result = await auth_controller.change_password(password_data, current_user, db)
+    result = auth_controller.change_password(password_data, current_user, db)
     return Message(message=result["message"])
 
 
 @router.get("/users", response_model=List[UserResponse])
-async def get_users(
+def get_users(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_user),
@@ -168,8 +164,8 @@ async def get_users(
             detail="Chỉ team manager mới có thể xem danh sách users"
         )
     
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    # Chỉ đọc các cột của UserResponse, không dựng object User
+    return db.execute(_USER_PROFILE_SELECT.offset(skip).limit(limit)).all()
 
 
 # ---- Health / Misc ----
@@ -1,16 +1,45 @@
 """
 API endpoints cho lời mời thành viên nhóm
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
+from typing import List
 from ..database import get_db
 from ..models.user import User
 from ..models import Invitation  # Import Invitation model from models package
-from ..schemas import InvitationCreate, InvitationResponse, Message
+from ..schemas import InvitationAccept, InvitationCreate, InvitationResponse, Message
 from ..services import invitation_service
 from ..middleware.auth import get_current_user
 
-router = APIRouter(prefix="/api/v1/invitations", tags=["Invitations"])
+router = APIRouter(prefix="/api/v1/invitations", tags=["Invitations"], default_response_class=ORJSONResponse)
+
+# Các cột InvitationResponse cần, đọc dạng row thay vì dựng object ORM
+_INVITATION_COLUMNS = select(
+    Invitation.id, Invitation.email, Invitation.team_id, Invitation.invited_by,
+    Invitation.token, Invitation.is_accepted, Invitation.created_at, Invitation.accepted_at
+)
+
+
+def _get_invitation_for_update(db: Session, invitation_id: int):
+    """
+    Đọc các cột cần kiểm tra quyền của lời mời và khóa dòng đến hết transaction
+    (FOR UPDATE trên PostgreSQL; SQLite bỏ qua mệnh đề này)
+    
+    Args:
+        invitation_id: ID lời mời
+        db: Database session
+        
+    Returns:
+        Row (invited_by, is_accepted) hoặc None nếu không tồn tại
+    """
+    return db.execute(
+        select(Invitation.invited_by, Invitation.is_accepted)
+        .where(Invitation.id == invitation_id)
+        .with_for_update(of=Invitation)
+    ).first()
+
 
 @router.post("/invite", response_model=InvitationResponse)
 def invite_member(
@@ -24,16 +53,37 @@ def invite_member(
     invitation = invitation_service.create_invitation(db, invitation_in, invited_by=current_user.id)
     return invitation
 
-@router.get("/accept/{token}", response_model=Message)
+@router.get("/my", response_model=List[InvitationResponse])
+def get_my_invitations(
+    skip: int = Query(0, ge=0, description="Số lượng bản ghi bỏ qua"),
+    limit: int = Query(100, ge=1, le=1000, description="Số lượng bản ghi tối đa"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Lấy danh sách lời mời tham gia nhóm của user hiện tại (mới nhất trước)
+    Dùng partial index ix_inv_pending (email, chỉ lời mời chưa chấp nhận)
+    """
+    invitations = db.execute(
+        _INVITATION_COLUMNS
+        .where(Invitation.email == current_user.email, Invitation.is_accepted == False)
+        .order_by(Invitation.id.desc())
+        .offset(skip)
+        .limit(limit)
+    ).all()
+    return invitations
+
+@router.post("/accept", response_model=Message)
 def accept_invitation(
-    token: str,
+    accept_data: InvitationAccept,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Thành viên chấp nhận lời mời tham gia nhóm
+    Token gửi trong body (POST) để proxy/trình duyệt không prefetch hay cache link chấp nhận
     """
-    ok = invitation_service.accept_invitation(db, token, current_user)
+    ok = invitation_service.accept_invitation(db, accept_data.token, current_user)
     if not ok:
         raise HTTPException(status_code=400, detail="Lời mời không hợp lệ hoặc đã được sử dụng.")
     return Message(message="Tham gia nhóm thành công!")
@@ -47,7 +97,8 @@ def cancel_invitation(
     """
     Hủy lời mời (chỉ người tạo mới có thể hủy)
     """
-    invitation = db.query(Invitation).filter(Invitation.id == invitation_id).first()
+    # Chỉ đọc các cột cần để kiểm tra quyền, không dựng object ORM
+    invitation = _get_invitation_for_update(db, invitation_id)
     if not invitation:
         raise HTTPException(status_code=404, detail="Lời mời không tồn tại.")
     
@@ -57,6 +108,9 @@ def cancel_invitation(
     if invitation.is_accepted:
         raise HTTPException(status_code=400, detail="Không thể hủy lời mời đã được chấp nhận.")
     
-    db.delete(invitation)
+    # Xóa trực tiếp; điều kiện is_accepted tránh xóa lời mời vừa được chấp nhận
+    db.execute(
+        delete(Invitation).where(Invitation.id == invitation_id, Invitation.is_accepted == False)
+    )
     db.commit()
     return Message(message="Hủy lời mời thành công!")
@@ -3,33 +3,41 @@ Notifications Router - API endpoints cho quản lý thông báo
 CRUD operations cho notifications của user
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from ..database import get_db
 from ..models.user import User
 from ..models.notification import Notification
 from ..schemas import NotificationResponse, Message
 from ..middleware.auth import get_current_user
-from ..services.notification_service import notification_service
+from ..services.notification_service import invalidate_unread_count, notification_service
+from ..utils.pagination import NEXT_CURSOR_HEADER, reject_skip_with_cursor
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
 
 @router.get("/", response_model=List[NotificationResponse])
-async def get_notifications(
+def get_notifications(
+    response: Response,
     skip: int = Query(0, ge=0, description="Số lượng bản ghi bỏ qua"),
+    cursor: Optional[str] = Query(None, description="Cursor trang kế tiếp (header X-Next-Cursor)"),
     limit: int = Query(20, ge=1, le=100, description="Số lượng bản ghi tối đa"),
     unread_only: bool = Query(False, description="Chỉ lấy thông báo chưa đọc"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Lấy danh sách thông báo của user hiện tại
+    Lấy danh sách thông báo của user hiện tại (mới nhất trước)
+    Cursor trang kế tiếp trả trong header X-Next-Cursor (không có nếu là trang cuối);
+    skip (phân trang OFFSET) vẫn dùng được nhưng không được truyền cùng cursor
     
     Args:
+        response: Response để gắn header cursor
         skip: Số lượng bản ghi bỏ qua
+        cursor: Cursor trang kế tiếp
         limit: Số lượng bản ghi tối đa
         unread_only: Chỉ lấy thông báo chưa đọc
         current_user: User hiện tại
@@ -38,19 +46,23 @@ async def get_notifications(
     Returns:
         List[NotificationResponse]: Danh sách thông báo
     """
-    notifications = notification_service.get_user_notifications(
+    reject_skip_with_cursor(skip, cursor)
+    notifications, next_page = notification_service.get_user_notifications(
         db=db,
         user_id=current_user.id,
         skip=skip,
+        cursor=cursor,
         limit=limit,
         unread_only=unread_only
     )
+    if next_page:
+        response.headers[NEXT_CURSOR_HEADER] = next_page
     
     return notifications
 
 
 @router.get("/unread-count")
-async def get_unread_count(
+def get_unread_count(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -64,16 +76,13 @@ async def get_unread_count(
     Returns:
         Dict: Số lượng thông báo chưa đọc
     """
-    count = db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_read == False
-    ).count()
+    count = notification_service.get_unread_count(db=db, user_id=current_user.id)
     
     return {"unread_count": count}
 
 
 @router.put("/{notification_id}/read", response_model=Message)
-async def mark_notification_read(
+def mark_notification_read(
     notification_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -105,7 +114,7 @@ async def mark_notification_read(
 
 
 @router.put("/read-all", response_model=Message)
-async def mark_all_notifications_read(
+def mark_all_notifications_read(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -128,7 +137,7 @@ async def mark_all_notifications_read(
 
 
 @router.delete("/{notification_id}", response_model=Message)
-async def delete_notification(
+def delete_notification(
     notification_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -144,18 +153,20 @@ async def delete_notification(
     Returns:
         Message: Thông báo thành công
     """
-    notification = db.query(Notification).filter(
-        Notification.id == notification_id,
-        Notification.user_id == current_user.id
+    # Kiểm tra quyền sở hữu nằm trong điều kiện WHERE: xóa và kiểm tra trong một câu lệnh
+    deleted = db.execute(
+        delete(Notification)
+        .where(Notification.id == notification_id, Notification.user_id == current_user.id)
+        .returning(Notification.id)
     ).first()
     
-    if not notification:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Không tìm thấy thông báo"
         )
     
-    db.delete(notification)
     db.commit()
+    invalidate_unread_count(current_user.id)
     
     return Message(message="Đã xóa thông báo thành công")
\ No newline at end of file
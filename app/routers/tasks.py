@@ -3,9 +3,10 @@ Tasks Router - API endpoints cho quản lý công việc
 CRUD operations cho tasks với phân quyền team manager/member
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import logging
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, bindparam, exists, literal, or_, select
 from typing import List, Optional
 from datetime import datetime
 
@@ -19,13 +20,81 @@ from ..schemas import (
 )
 from ..middleware.auth import get_current_user
 from ..services.email_service import email_service
+from ..utils.pagination import NEXT_CURSOR_HEADER, keyset_before, next_cursor, reject_skip_with_cursor
 
 router = APIRouter(prefix="/api/v1/tasks", tags=["Tasks"])
+logger = logging.getLogger(__name__)
+
+# Các truy vấn có hình dạng cố định, dựng sẵn với tham số bind
+_TASK_DETAIL_SELECT = select(Task).options(
+    joinedload(Task.creator),
+    joinedload(Task.assignee),
+    joinedload(Task.team)
+).where(Task.id == bindparam("task_id"))
+# Danh sách tasks chỉ đọc các cột của TaskResponse dạng row, không dựng object ORM
+# (không identity map, không theo dõi thay đổi); FastAPI dựng TaskResponse từ row
+_TASK_RESPONSE_COLUMNS = tuple(getattr(Task, field) for field in TaskResponse.model_fields)
+_MY_TASKS_SELECT = select(*_TASK_RESPONSE_COLUMNS).where(
+    or_(Task.creator_id == bindparam("user_id"), Task.assignee_id == bindparam("user_id"))
+).order_by(Task.created_at.desc())
+_MY_TASKS_BY_STATUS_SELECT = _MY_TASKS_SELECT.where(Task.status == bindparam("status"))
+
+
+def _is_active_member(team_id, user_id):
+    """EXISTS: user là thành viên đang hoạt động của team"""
+    return exists().where(
+        TeamMember.team_id == team_id, TeamMember.user_id == user_id, TeamMember.is_active == True
+    )
+
+
+def _get_assignee(db: Session, assignee_id: int, team_id: Optional[int]):
+    """
+    Đọc assignee và kiểm tra membership trong team bằng một truy vấn
+    
+    Args:
+        db: Database session
+        assignee_id: ID người được gán
+        team_id: ID team của task (None nếu task không thuộc team)
+        
+    Returns:
+        Row (email, full_name, is_member) hoặc None nếu assignee không tồn tại
+    """
+    is_member = _is_active_member(team_id, User.id) if team_id else literal(True)
+    return db.execute(
+        select(User.email, User.full_name, is_member.label("is_member")).where(User.id == assignee_id)
+    ).first()
+
+
+def _get_task_targets(db: Session, task_data: TaskCreate, current_user: User):
+    """
+    Đọc mọi dữ liệu cần để kiểm tra task mới trong một truy vấn: assignee (và membership
+    trong team), manager của team, quyền manager/member của người tạo
+    
+    Args:
+        db: Database session
+        task_data: Dữ liệu task mới
+        current_user: User tạo task
+        
+    Returns:
+        Row (assignee_email, assignee_name, assignee_is_member, team_manager_id,
+        creator_is_manager, creator_is_member); cột là NULL nếu đối tượng tương ứng không tồn tại
+    """
+    assignee = select(User.email, User.full_name).where(User.id == task_data.assignee_id)
+    return db.execute(select(
+        assignee.with_only_columns(User.email).scalar_subquery().label("assignee_email"),
+        assignee.with_only_columns(User.full_name).scalar_subquery().label("assignee_name"),
+        _is_active_member(task_data.team_id, task_data.assignee_id).label("assignee_is_member"),
+        select(Team.manager_id).where(Team.id == task_data.team_id).scalar_subquery().label("team_manager_id"),
+        exists().where(Team.manager_id == current_user.id, Team.is_active == True).label("creator_is_manager"),
+        _is_active_member(task_data.team_id, current_user.id).label("creator_is_member"),
+    )).one()
 
 
 @router.get("/", response_model=List[TaskResponse])
-async def get_tasks(
+def get_tasks(
+    response: Response,
     skip: int = Query(0, ge=0, description="Số lượng bản ghi bỏ qua"),
+    cursor: Optional[str] = Query(None, description="Cursor trang kế tiếp (header X-Next-Cursor)"),
     limit: int = Query(100, ge=1, le=1000, description="Số lượng bản ghi tối đa"),
     status: Optional[TaskStatusEnum] = Query(None, description="Lọc theo trạng thái"),
     priority: Optional[TaskPriorityEnum] = Query(None, description="Lọc theo độ ưu tiên"),
@@ -35,12 +104,16 @@ async def get_tasks(
     db: Session = Depends(get_db)
 ):
     """
-    Lấy danh sách tasks
+    Lấy danh sách tasks (mới nhất trước)
     Team member chỉ xem được tasks của mình hoặc tasks không được gán
     Team manager xem được tất cả tasks trong team
+    Cursor trang kế tiếp trả trong header X-Next-Cursor (không có nếu là trang cuối);
+    skip (phân trang OFFSET) vẫn dùng được nhưng không được truyền cùng cursor
     
     Args:
+        response: Response để gắn header cursor
         skip: Số lượng bản ghi bỏ qua
+        cursor: Cursor trang kế tiếp
         limit: Số lượng bản ghi tối đa
         status: Lọc theo trạng thái
         priority: Lọc theo độ ưu tiên
@@ -52,17 +125,27 @@ async def get_tasks(
     Returns:
         List[TaskResponse]: Danh sách tasks
     """
-    query = db.query(Task).options(joinedload(Task.creator), joinedload(Task.assignee))
+    reject_skip_with_cursor(skip, cursor)
+    
+    # TaskResponse chỉ dùng các cột của Task (creator_id, assignee_id...): không nạp kèm
+    # creator/assignee, tránh JOIN nhân bản dòng hoặc thêm truy vấn IN cho mỗi trang
+    query = db.query(*_TASK_RESPONSE_COLUMNS)
+    
+    # Các team user quản lý, đọc một lần: vừa xác định quyền manager (có team đang hoạt động,
+    # như User.is_team_manager) vừa dùng làm danh sách IN thay cho subquery
+    managed_teams = db.execute(
+        select(Team.id, Team.is_active).where(Team.manager_id == current_user.id)
+    ).all()
     
     # Phân quyền xem tasks
-    if current_user.is_team_manager():
+    if any(team.is_active for team in managed_teams):
         # Team manager có thể xem tất cả tasks hoặc tasks trong teams mà họ quản lý
-        manager_teams = db.query(Team.id).filter(Team.manager_id == current_user.id).subquery()
+        manager_team_ids = [team.id for team in managed_teams]
         query = query.filter(
             or_(
                 Task.creator_id == current_user.id,  # Tasks họ tạo
                 Task.assignee_id == current_user.id,  # Tasks được gán cho họ
-                Task.team_id.in_(manager_teams),  # Tasks trong teams họ quản lý
+                Task.team_id.in_(manager_team_ids),  # Tasks trong teams họ quản lý
                 Task.team_id.is_(None)  # Tasks không thuộc team nào
             )
         )
@@ -89,17 +172,24 @@ async def get_tasks(
     if team_id:
         query = query.filter(Task.team_id == team_id)
     
-    # Sắp xếp theo created_at desc
-    query = query.order_by(Task.created_at.desc())
+    # Phân trang keyset: chỉ đọc các dòng sau cursor thay vì quét rồi bỏ qua OFFSET dòng
+    if cursor:
+        query = query.filter(keyset_before(Task, cursor))
     
-    # Phân trang
-    tasks = query.offset(skip).limit(limit).all()
+    # Sắp xếp theo created_at desc (id desc để thứ tự ổn định), lấy dư một dòng để biết còn trang sau
+    query = query.order_by(Task.created_at.desc(), Task.id.desc())
+    if skip:
+        query = query.offset(skip)
+    tasks = query.limit(limit + 1).all()
+    next_page = next_cursor(tasks, limit)
+    if next_page:
+        response.headers[NEXT_CURSOR_HEADER] = next_page
     
     return tasks
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(
+def get_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -118,11 +208,7 @@ async def get_task(
     Raises:
         HTTPException: Nếu task không tồn tại hoặc không có quyền xem
     """
-    task = db.query(Task).options(
-        joinedload(Task.creator),
-        joinedload(Task.assignee),
-        joinedload(Task.team)
-    ).filter(Task.id == task_id).first()
+    task = db.scalar(_TASK_DETAIL_SELECT, {"task_id": task_id})
     
     if not task:
         raise HTTPException(
@@ -141,8 +227,9 @@ async def get_task(
 
 
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
-async def create_task(
+def create_task(
     task_data: TaskCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -151,6 +238,7 @@ async def create_task(
     
     Args:
         task_data: Dữ liệu task mới
+        background_tasks: Hàng đợi tác vụ nền để gửi email
         current_user: User hiện tại
         db: Database session
         
@@ -160,51 +248,40 @@ async def create_task(
     Raises:
         HTTPException: Nếu assignee hoặc team không tồn tại
     """
+    # Assignee, team và quyền của người tạo được đọc trong một round-trip
+    targets = _get_task_targets(db, task_data, current_user)
+    
     # Kiểm tra assignee có tồn tại không
     if task_data.assignee_id:
-        assignee = db.query(User).filter(User.id == task_data.assignee_id).first()
-        if not assignee:
+        if targets.assignee_email is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Không tìm thấy người dùng được gán task"
             )
         
         # Nếu có team_id, kiểm tra assignee có phải thành viên của team không
-        if task_data.team_id:
-            team_member = db.query(TeamMember).filter(
-                TeamMember.team_id == task_data.team_id,
-                TeamMember.user_id == task_data.assignee_id,
-                TeamMember.is_active == True
-            ).first()
-            if not team_member:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Người dùng được gán phải là thành viên của nhóm"
-                )
+        if task_data.team_id and not targets.assignee_is_member:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Người dùng được gán phải là thành viên của nhóm"
+            )
     
     # Kiểm tra team có tồn tại không
     if task_data.team_id:
-        team = db.query(Team).filter(Team.id == task_data.team_id).first()
-        if not team:
+        if targets.team_manager_id is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Không tìm thấy team"
             )
         
-        # Kiểm tra quyền gán task cho team
-        if not current_user.is_team_manager() and team.manager_id != current_user.id:
-            # Kiểm tra user có phải member của team không
-            is_member = db.query(TeamMember).filter(
-                TeamMember.team_id == task_data.team_id,
-                TeamMember.user_id == current_user.id,
-                TeamMember.is_active == True
-            ).first()
-            
-            if not is_member:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Bạn không có quyền tạo task cho team này"
-                )
+        # Kiểm tra quyền gán task cho team: manager hoặc member của team
+        if (not targets.creator_is_manager
+                and targets.team_manager_id != current_user.id
+                and not targets.creator_is_member):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Bạn không có quyền tạo task cho team này"
+            )
     
     # Tạo task mới
     new_task = Task(
@@ -223,24 +300,23 @@ async def create_task(
     db.commit()
     db.refresh(new_task)
     
-    # Gửi email thông báo nếu có assignee
+    # Gửi email thông báo nếu có assignee (chạy nền sau khi trả response)
     if task_data.assignee_id and task_data.assignee_id != current_user.id:
-        assignee = db.query(User).filter(User.id == task_data.assignee_id).first()
-        if assignee:
-            due_date_str = task_data.due_date.strftime("%d/%m/%Y %H:%M") if task_data.due_date else None
-            await email_service.send_task_assignment_email(
-                assignee_email=assignee.email,
-                assignee_name=assignee.full_name or assignee.username,
-                task_title=new_task.title,
-                assigner_name=current_user.full_name or current_user.email.split('@')[0],
-                due_date=due_date_str
-            )
+        due_date_str = task_data.due_date.strftime("%d/%m/%Y %H:%M") if task_data.due_date else None
+        background_tasks.add_task(
+            email_service.send_task_assignment_email,
+            assignee_email=targets.assignee_email,
+            assignee_name=targets.assignee_name or targets.assignee_email.split('@')[0],
+            task_title=new_task.title,
+            assigner_name=current_user.full_name or current_user.email.split('@')[0],
+            due_date=due_date_str
+        )
     
     return new_task
 
 
 @router.put("/{task_id}", response_model=TaskResponse)
-async def update_task(
+def update_task(
     task_id: int,
     task_data: TaskUpdate,
     current_user: User = Depends(get_current_user),
@@ -278,10 +354,9 @@ async def update_task(
     
     # Cập nhật các trường
     update_data = task_data.model_dump(exclude_unset=True)
-    print(f"Updating task {task_id} with data: {update_data}")
+    logger.debug("Updating task %s with data: %s", task_id, update_data)
     
     for field, value in update_data.items():
-        print(f"Setting {field} = {value}")
         if field == "status" and value:
             setattr(task, field, TaskStatus(value))
             # Cập nhật completed_at nếu status là completed
@@ -290,8 +365,8 @@ async def update_task(
         elif field == "priority" and value:
             setattr(task, field, TaskPriority(value))
         elif field == "assignee_id" and value:
-            # Kiểm tra assignee có tồn tại không
-            assignee = db.query(User).filter(User.id == value).first()
+            # Kiểm tra assignee có tồn tại không (cùng membership trong team, một truy vấn)
+            assignee = _get_assignee(db, value, task.team_id)
             if not assignee:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -299,18 +374,11 @@ async def update_task(
                 )
             
             # Nếu task có team_id, kiểm tra assignee có phải thành viên của team không
-            if task.team_id:
-                from ..models.team import TeamMember
-                team_member = db.query(TeamMember).filter(
-                    TeamMember.team_id == task.team_id,
-                    TeamMember.user_id == value,
-                    TeamMember.is_active == True
-                ).first()
-                if not team_member:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Người dùng được gán phải là thành viên của nhóm"
-                    )
+            if not assignee.is_member:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Người dùng được gán phải là thành viên của nhóm"
+                )
             
             setattr(task, field, value)
         else:
@@ -320,13 +388,13 @@ async def update_task(
     task.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(task)
-    print(f"Task {task_id} updated successfully. assignee_id = {task.assignee_id}")
+    logger.debug("Task %s updated successfully. assignee_id = %s", task_id, task.assignee_id)
     
     return task
 
 
 @router.delete("/{task_id}", response_model=Message)
-async def delete_task(
+def delete_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -368,7 +436,7 @@ async def delete_task(
 
 
 @router.get("/my-tasks/", response_model=List[TaskResponse])
-async def get_my_tasks(
+def get_my_tasks(
     status: Optional[TaskStatusEnum] = Query(None, description="Lọc theo trạng thái"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -384,19 +452,13 @@ async def get_my_tasks(
     Returns:
         List[TaskResponse]: Danh sách tasks của user
     """
-    query = db.query(Task).options(
-        joinedload(Task.creator),
-        joinedload(Task.assignee)
-    ).filter(
-        or_(
-            Task.creator_id == current_user.id,
-            Task.assignee_id == current_user.id
-        )
-    )
-    
+    # Không nạp kèm creator/assignee: TaskResponse chỉ cần các cột của Task
     if status:
-        query = query.filter(Task.status == TaskStatus(status.value))
-    
-    tasks = query.order_by(Task.created_at.desc()).all()
+        tasks = db.execute(
+            _MY_TASKS_BY_STATUS_SELECT,
+            {"user_id": current_user.id, "status": TaskStatus(status.value)}
+        ).all()
+    else:
+        tasks = db.execute(_MY_TASKS_SELECT, {"user_id": current_user.id}).all()
     
     return tasks
\ No newline at end of file
@@ -4,7 +4,7 @@ CRUD operations cho teams và team members với phân quyền
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, undefer
 from sqlalchemy import func
 from typing import List, Optional
 
@@ -20,7 +20,7 @@ router = APIRouter(prefix="/api/v1/teams", tags=["Teams"])
 
 
 @router.get("/", response_model=List[TeamResponse])
-async def get_teams(
+def get_teams(
     skip: int = Query(0, ge=0, description="Số lượng bản ghi bỏ qua"),
     limit: int = Query(100, ge=1, le=1000, description="Số lượng bản ghi tối đa"),
     current_user: User = Depends(get_current_user),
@@ -57,17 +57,15 @@ async def get_teams(
         Team.is_active == True
     )
     
-    # Kết hợp cả hai danh sách
-    teams = managed_teams.union(joined_teams).offset(skip).limit(limit).all()
-    
-    # Thêm member_count cho mỗi team
-    for team in teams:
-        team.member_count = team.get_member_count()
+    # Kết hợp cả hai danh sách, member_count nạp cùng truy vấn (subquery COUNT)
+    teams = managed_teams.union(joined_teams).options(
+        undefer(Team.member_count)
+    ).offset(skip).limit(limit).all()
     
     return teams
 
 @router.post("/{team_id}/leave", response_model=Message)
-async def leave_team(
+def leave_team(
     team_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -114,7 +112,7 @@ async def leave_team(
 
 
 @router.get("/{team_id}", response_model=TeamResponse)
-async def get_team(
+def get_team(
     team_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -163,12 +161,11 @@ async def get_team(
             detail="Bạn không có quyền xem team này"
         )
     
-    team.member_count = team.get_member_count()
     return team
 
 
 @router.post("/", response_model=TeamResponse, status_code=status.HTTP_201_CREATED)
-async def create_team(
+def create_team(
     team_data: TeamCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -198,9 +195,9 @@ async def create_team(
     # Tạo invite code
     new_team.generate_invite_code()
 
+    # Team và manager member được ghi trong cùng một transaction (một lần commit)
     db.add(new_team)
-    db.commit()
-    db.refresh(new_team)
+    db.flush()
 
     # Thêm manager vào TeamMember
     manager_member = TeamMember(
@@ -212,12 +209,11 @@ async def create_team(
     db.add(manager_member)
     db.commit()
 
-    new_team.member_count = 1
     return new_team
 
 
 @router.put("/{team_id}", response_model=TeamResponse)
-async def update_team(
+def update_team(
     team_id: int,
     team_data: TeamUpdate,
     current_user: User = Depends(get_current_user),
@@ -264,12 +260,11 @@ async def update_team(
     db.commit()
     db.refresh(team)
     
-    team.member_count = team.get_member_count()
     return team
 
 
 @router.delete("/{team_id}", response_model=Message)
-async def delete_team(
+def delete_team(
     team_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -314,7 +309,7 @@ async def delete_team(
 from ..schemas import TeamMemberResponse
 
 @router.get("/{team_id}/members", response_model=List[TeamMemberResponse])
-async def get_team_members(
+def get_team_members(
     team_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -339,8 +334,6 @@ async def get_team_members(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Bạn không có quyền xem team này"
         )
-    team.member_count = team.get_member_count()
-
     members = db.query(User, TeamMember).join(
         TeamMember, User.id == TeamMember.user_id
     ).filter(
@@ -357,7 +350,7 @@ async def get_team_members(
 
 
 @router.post("/{team_id}/members/{user_id}", response_model=Message)
-async def add_team_member(
+def add_team_member(
     team_id: int,
     user_id: int,
     current_user: User = Depends(get_current_user),
@@ -437,7 +430,7 @@ async def add_team_member(
 
 
 @router.delete("/{team_id}/members/{user_id}", response_model=Message)
-async def remove_team_member(
+def remove_team_member(
     team_id: int,
     user_id: int,
     current_user: User = Depends(get_current_user),
@@ -513,7 +506,7 @@ async def remove_team_member(
 
 
 @router.post("/join", response_model=Message)
-async def join_team_by_invite(
+def join_team_by_invite(
     join_request: TeamJoinRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -577,7 +570,7 @@ async def join_team_by_invite(
 
 
 @router.get("/{team_id}/invite-link")
-async def get_team_invite_link(
+def get_team_invite_link(
     team_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -622,7 +615,7 @@ async def get_team_invite_link(
 
 
 @router.put("/{team_id}/invite-link/toggle")
-async def toggle_invite_link(
+def toggle_invite_link(
     team_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -665,7 +658,7 @@ async def toggle_invite_link(
 
 
 @router.put("/{team_id}/invite-link/regenerate")
-async def regenerate_invite_code(
+def regenerate_invite_code(
     team_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
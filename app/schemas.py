@@ -265,6 +265,9 @@ class InvitationCreate(BaseModel):
     email: EmailStr
     team_id: int
 
+class InvitationAccept(BaseModel):
+    token: str
+
 class InvitationResponse(BaseModel):
     id: int
     email: EmailStr
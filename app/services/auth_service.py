@@ -7,6 +7,7 @@ Service xử lý các chức năng xác thực và phân quyền người dùng
 
 import hashlib
 import secrets
+from calendar import timegm
 from datetime import datetime, timedelta
 from typing import Optional, Union
 
@@ -15,9 +16,14 @@ import qrcode
 import io
 import base64
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 
 from ..config import settings
+from ..utils.auth import ACCESS_TTL, encode_jwt, verify_totp_code
+
+# Thời hạn các loại token (tạo một lần khi load module)
+_INVITATION_TOKEN_TTL = timedelta(days=7)
+_PASSWORD_RESET_TOKEN_TTL = timedelta(hours=1)
 
 
 class AuthService:
@@ -28,6 +34,8 @@ class AuthService:
         self.secret_key = settings.secret_key
         self.algorithm = settings.algorithm
         self.access_token_expire_minutes = settings.access_token_expire_minutes
+        # Key JWT dựng sẵn một lần, dùng chung cho mọi lần ký/verify
+        self.jwt_key = jwk.construct(self.secret_key, self.algorithm)
     
     def get_password_hash(self, password: str) -> str:
         """Hash mật khẩu sử dụng bcrypt"""
@@ -37,23 +45,21 @@ class AuthService:
         """Xác minh mật khẩu"""
         return self.pwd_context.verify(plain_password, hashed_password)
     
-    def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
-        """Tạo JWT access token"""
+    def create_access_token(
+        self, data: dict, expires_delta: Optional[timedelta] = None, now: Optional[datetime] = None
+    ) -> str:
+        """Tạo JWT access token (now: thời điểm hiện tại đã lấy sẵn, nếu có)"""
         to_encode = data.copy()
+        expire = (now or datetime.utcnow()) + (expires_delta or ACCESS_TTL)
         
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=self.access_token_expire_minutes)
-        
-        to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
-        return encoded_jwt
+        # exp đổi sẵn sang timestamp để ký bằng signer HMAC dựng sẵn (encode_jwt)
+        to_encode["exp"] = timegm(expire.utctimetuple())
+        return encode_jwt(to_encode)
     
     def verify_token(self, token: str) -> Optional[dict]:
         """Xác minh JWT token"""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            payload = jwt.decode(token, self.jwt_key, algorithms=[self.algorithm])
             return payload
         except JWTError:
             return None
@@ -104,12 +110,8 @@ class AuthService:
         return f"data:image/png;base64,{img_base64}"
     
     def verify_totp(self, secret: str, token: str) -> bool:
-        """Xác minh TOTP token"""
-        try:
-            totp = pyotp.TOTP(secret)
-            return totp.verify(token, valid_window=1)  # Allow 1 window tolerance
-        except Exception:
-            return False
+        """Xác minh TOTP token (HMAC trực tiếp, cho phép lệch 1 bước thời gian)"""
+        return verify_totp_code(secret, token)
     
     def generate_backup_codes(self, count: int = 10) -> list[str]:
         """Tạo backup codes cho 2FA"""
@@ -132,7 +134,7 @@ class AuthService:
     
     def generate_email_otp(self, length: int = 6) -> str:
         """Tạo OTP gửi qua email"""
-        return ''.join([str(secrets.randbelow(10)) for _ in range(length)])
+        return f"{secrets.randbelow(10 ** length):0{length}d}"
     
     def generate_invitation_token(self, team_id: int, email: str) -> str:
         """Tạo token để mời vào team"""
@@ -140,14 +142,14 @@ class AuthService:
             "team_id": team_id,
             "email": email,
             "type": "invitation",
-            "exp": datetime.utcnow() + timedelta(days=7)  # Token expires in 7 days
+            "exp": datetime.utcnow() + _INVITATION_TOKEN_TTL  # Token expires in 7 days
         }
-        return jwt.encode(data, self.secret_key, algorithm=self.algorithm)
+        return jwt.encode(data, self.jwt_key, algorithm=self.algorithm)
     
     def verify_invitation_token(self, token: str) -> Optional[dict]:
         """Xác minh invitation token"""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            payload = jwt.decode(token, self.jwt_key, algorithms=[self.algorithm])
             if payload.get("type") == "invitation":
                 return payload
             return None
@@ -159,16 +161,20 @@ class AuthService:
         data = {
             "email": email,
             "type": "password_reset",
-            "exp": datetime.utcnow() + timedelta(hours=1)  # Token expires in 1 hour
+            "exp": datetime.utcnow() + _PASSWORD_RESET_TOKEN_TTL  # Token expires in 1 hour
         }
-        return jwt.encode(data, self.secret_key, algorithm=self.algorithm)
+        return jwt.encode(data, self.jwt_key, algorithm=self.algorithm)
     
     def verify_password_reset_token(self, token: str) -> Optional[str]:
         """Xác minh password reset token và trả về email"""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            payload = jwt.decode(token, self.jwt_key, algorithms=[self.algorithm])
             if payload.get("type") == "password_reset":
                 return payload.get("email")
             return None
         except JWTError:
-            return None
\ No newline at end of file
+            return None
+
+
+# Tạo instance global
+auth_service = AuthService()
@@ -3,6 +3,7 @@ Email Service - Gửi email OTP và thông báo
 Sử dụng SMTP để gửi email xác thực 2FA
 """
 
+import asyncio
 import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -19,6 +20,40 @@ class EmailService:
         self.username = settings.SMTP_USERNAME
         self.password = settings.SMTP_PASSWORD
         self.from_email = settings.EMAIL_FROM or settings.SMTP_USERNAME
+        # Kết nối SMTP dùng chung giữa các lần gửi (tránh bắt tay TCP/TLS/AUTH mỗi email),
+        # lock để mỗi thời điểm chỉ một email đi qua kết nối
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._smtp_lock: Optional[asyncio.Lock] = None
+    
+    async def _get_smtp(self) -> aiosmtplib.SMTP:
+        """Lấy kết nối SMTP đang mở, kết nối (STARTTLS + đăng nhập) lại nếu cần"""
+        if self._smtp is None or not self._smtp.is_connected:
+            smtp = aiosmtplib.SMTP(
+                hostname=self.smtp_server,
+                port=self.smtp_port,
+                start_tls=True,
+                username=self.username,
+                password=self.password,
+            )
+            await smtp.connect()
+            self._smtp = smtp
+        return self._smtp
+    
+    async def _send_message(self, message: MIMEMultipart) -> None:
+        """
+        Gửi message qua kết nối SMTP dùng chung
+        Server có thể đã đóng kết nối rảnh: khi đó kết nối lại và gửi lại một lần
+        """
+        if self._smtp_lock is None:
+            self._smtp_lock = asyncio.Lock()
+        async with self._smtp_lock:
+            try:
+                smtp = await self._get_smtp()
+                await smtp.send_message(message)
+            except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+                self._smtp = None
+                smtp = await self._get_smtp()
+                await smtp.send_message(message)
     
     async def send_email(
         self, 
@@ -52,15 +87,8 @@ class EmailService:
             else:
                 message.attach(MIMEText(body, "plain"))
             
-            # Gửi email
-            await aiosmtplib.send(
-                message,
-                hostname=self.smtp_server,
-                port=self.smtp_port,
-                start_tls=True,
-                username=self.username,
-                password=self.password,
-            )
+            # Gửi email (tái sử dụng kết nối SMTP)
+            await self._send_message(message)
             
             return True
             
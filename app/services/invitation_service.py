@@ -2,11 +2,13 @@
 Service xử lý logic lời mời thành viên nhóm
 """
 import secrets
+from datetime import datetime
 from sqlalchemy.orm import Session
 from ..models.invitation import Invitation
 from ..models.team import Team
 from ..models.user import User
 from ..schemas import InvitationCreate
+from . import team_service
 
 
 def create_invitation(db: Session, invitation_in: InvitationCreate, invited_by: int) -> Invitation:
@@ -39,11 +41,10 @@ def accept_invitation(db: Session, token: str, user: User) -> bool:
     invitation = get_invitation_by_token(db, token)
     if not invitation or invitation.is_accepted:
         return False
-    # Thêm user vào team
-    from . import team_service
+    # Thêm user vào team (bỏ qua nếu đã là thành viên) và đánh dấu lời mời đã dùng
+    # trong cùng một transaction
     team_service.add_member_to_team(db, invitation.team_id, user.id)
     invitation.is_accepted = True
-    from datetime import datetime
     invitation.accepted_at = datetime.utcnow()
     db.commit()
     return True
@@ -3,16 +3,47 @@ Notification Service - Quản lý tạo và gửi thông báo
 Hỗ trợ thông báo real-time và email
 """
 
+from sqlalchemy import Row, bindparam, func, select, update
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 import json
+import threading
+from cachetools import TTLCache
 
 from ..models.notification import Notification, NotificationTypeEnum, NotificationPriorityEnum
 from ..models.user import User
 from ..models.task import Task
 from ..models.team import Team
+from ..schemas import NotificationResponse
 from ..services.email_service import email_service
+from ..utils.pagination import keyset_before, next_cursor, reject_skip_with_cursor
+
+# Số thông báo chưa đọc theo user id (TTL ngắn), xóa khi thông báo của user được tạo,
+# đánh dấu đã đọc hoặc bị xóa
+_UNREAD_COUNT_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+_UNREAD_COUNT_LOCK = threading.Lock()
+# Số lần invalidate của từng user: số đếm đọc từ DB chỉ được ghi vào cache nếu không có
+# lần invalidate nào xảy ra trong lúc truy vấn (tránh ghi đè bằng số cũ)
+_UNREAD_COUNT_GENERATIONS: Dict[int, int] = {}
+
+# Danh sách thông báo chỉ đọc các cột của NotificationResponse dạng row, không dựng object ORM
+_NOTIFICATION_RESPONSE_COLUMNS = tuple(
+    getattr(Notification, field) for field in NotificationResponse.model_fields
+)
+
+# Câu COUNT dựng sẵn một lần, mỗi lần gọi chỉ truyền user_id
+_UNREAD_COUNT_SELECT = select(func.count(Notification.id)).where(
+    Notification.user_id == bindparam("user_id"),
+    Notification.is_read == False
+)
+
+
+def invalidate_unread_count(user_id: int) -> None:
+    """Xóa số thông báo chưa đọc đã cache của user sau khi thông báo của user thay đổi"""
+    with _UNREAD_COUNT_LOCK:
+        _UNREAD_COUNT_CACHE.pop(user_id, None)
+        _UNREAD_COUNT_GENERATIONS[user_id] = _UNREAD_COUNT_GENERATIONS.get(user_id, 0) + 1
 
 
 class NotificationService:
@@ -68,6 +99,7 @@ class NotificationService:
         
         db.add(notification)
         db.commit()
+        invalidate_unread_count(user_id)
         db.refresh(notification)
         
         # Gửi email nếu yêu cầu
@@ -296,28 +328,40 @@ class NotificationService:
         db: Session,
         user_id: int,
         skip: int = 0,
+        cursor: Optional[str] = None,
         limit: int = 20,
         unread_only: bool = False
-    ) -> List[Notification]:
+    ) -> Tuple[List[Row], Optional[str]]:
         """
-        Lấy danh sách thông báo của user
+        Lấy danh sách thông báo của user (phân trang keyset, mới nhất trước)
+        Chỉ đọc các cột của NotificationResponse
         
         Args:
             db: Database session
             user_id: ID của user
-            skip: Số lượng bỏ qua
+            skip: Số lượng bỏ qua (không dùng cùng cursor)
+            cursor: Cursor của trang trước (None: trang đầu)
             limit: Số lượng tối đa
             unread_only: Chỉ lấy thông báo chưa đọc
             
         Returns:
-            List[Notification]: Danh sách thông báo
+            Tuple[List[Row], Optional[str]]: Danh sách thông báo và cursor trang kế tiếp
         """
-        query = db.query(Notification).filter(Notification.user_id == user_id)
+        reject_skip_with_cursor(skip, cursor)
+        query = db.query(*_NOTIFICATION_RESPONSE_COLUMNS).filter(Notification.user_id == user_id)
         
         if unread_only:
             query = query.filter(Notification.is_read == False)
         
-        return query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+        if cursor:
+            query = query.filter(keyset_before(Notification, cursor))
+        
+        # Lấy dư một bản ghi để biết còn trang sau hay không
+        query = query.order_by(Notification.created_at.desc(), Notification.id.desc())
+        if skip:
+            query = query.offset(skip)
+        notifications = query.limit(limit + 1).all()
+        return notifications, next_cursor(notifications, limit)
     
     def mark_notification_as_read(
         self,
@@ -344,6 +388,7 @@ class NotificationService:
         if notification and not notification.is_read:
             notification.mark_as_read()
             db.commit()
+            invalidate_unread_count(user_id)
             return True
         
         return False
@@ -363,15 +408,38 @@ class NotificationService:
         Returns:
             int: Số lượng thông báo đã cập nhật
         """
-        count = db.query(Notification).filter(
-            Notification.user_id == user_id,
-            Notification.is_read == False
-        ).update({
-            "is_read": True,
-            "read_at": datetime.utcnow()
-        })
+        # Một câu UPDATE; không đồng bộ các object Notification trong session
+        # (handler không giữ object nào) nên bỏ bước quét identity map
+        count = db.execute(
+            update(Notification)
+            .where(Notification.user_id == user_id, Notification.is_read == False)
+            .values(is_read=True, read_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
         
         db.commit()
+        invalidate_unread_count(user_id)
+        return count
+    
+    def get_unread_count(self, db: Session, user_id: int) -> int:
+        """
+        Lấy số thông báo chưa đọc của user (cache ngắn hạn, xóa khi có thay đổi)
+        
+        Args:
+            db: Database session
+            user_id: ID user
+            
+        Returns:
+            int: Số thông báo chưa đọc
+        """
+        with _UNREAD_COUNT_LOCK:
+            count = _UNREAD_COUNT_CACHE.get(user_id)
+            generation = _UNREAD_COUNT_GENERATIONS.get(user_id, 0)
+        if count is None:
+            count = db.scalar(_UNREAD_COUNT_SELECT, {"user_id": user_id})
+            with _UNREAD_COUNT_LOCK:
+                if _UNREAD_COUNT_GENERATIONS.get(user_id, 0) == generation:
+                    _UNREAD_COUNT_CACHE[user_id] = count
         return count
     
     async def _send_email_notification(
@@ -1,12 +1,52 @@
 """
 Service cho Team - Thêm thành viên vào team
 """
+from typing import Optional
+from sqlalchemy import exists, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from ..models.team import TeamMember
 
-def add_member_to_team(db: Session, team_id: int, user_id: int, role: str = "member"):
-    member = TeamMember(team_id=team_id, user_id=user_id, role=role, is_active=True)
+# INSERT hỗ trợ ON CONFLICT DO NOTHING theo dialect
+_INSERT_BY_DIALECT = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+def add_member_to_team(db: Session, team_id: int, user_id: int, role: str = "member") -> Optional[int]:
+    """
+    Thêm membership đang hoạt động cho user; người gọi commit cùng các thay đổi khác của mình
+
+    Trên PostgreSQL/SQLite dùng INSERT ... ON CONFLICT DO NOTHING RETURNING id dựa trên
+    partial unique index ux_team_members_active: kiểm tra trùng và thêm trong một round-trip
+
+    Args:
+        db: Database session
+        team_id: ID team
+        user_id: ID user
+        role: Vai trò trong team
+
+    Returns:
+        Optional[int]: ID membership mới, None nếu user đã là thành viên
+    """
+    values = {"team_id": team_id, "user_id": user_id, "role": role, "is_active": True}
+    insert = _INSERT_BY_DIALECT.get(db.get_bind().dialect.name)
+    if insert is not None:
+        return db.scalar(
+            insert(TeamMember)
+            .values(**values)
+            .on_conflict_do_nothing(
+                index_elements=[TeamMember.team_id, TeamMember.user_id],
+                index_where=TeamMember.is_active == True
+            )
+            .returning(TeamMember.id)
+        )
+
+    # Dialect khác: kiểm tra bằng EXISTS rồi mới thêm
+    if db.scalar(select(exists().where(
+        TeamMember.team_id == team_id, TeamMember.user_id == user_id, TeamMember.is_active == True
+    ))):
+        return None
+    member = TeamMember(**values)
     db.add(member)
-    db.commit()
-    db.refresh(member)
-    return member
+    db.flush()
+    return member.id
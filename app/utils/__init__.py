@@ -2,6 +2,6 @@
 Utils package - Tiện ích và helper functions
 """
 
-from . import auth
+from . import auth, pagination
 
-__all__ = ["auth"]
\ No newline at end of file
+__all__ = ["auth", "pagination"]
\ No newline at end of file
@@ -3,10 +3,19 @@ Authentication utilities - Xử lý xác thực và JWT tokens
 Bao gồm password hashing, JWT token generation, và 2FA
 """
 
+import hashlib
+import hmac
+import json
+import secrets
+import struct
+import time
+from calendar import timegm
 from datetime import datetime, timedelta
-from typing import Optional, Union
-from jose import JWTError, jwt
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+from jose import JWTError, jwk, jwt
 from passlib.context import CryptContext
+import orjson
 import pyotp
 import qrcode
 import io
@@ -16,6 +25,62 @@ from ..config import settings
 # Khởi tạo password context cho bcrypt
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Thời hạn mặc định của access token (tạo một lần khi load module)
+ACCESS_TTL = timedelta(minutes=settings.access_token_expire_minutes)
+
+# Key ký/verify JWT dựng sẵn một lần từ secret_key (jose không phải parse key mỗi lần gọi)
+_JWT_KEY = jwk.construct(settings.secret_key, settings.algorithm)
+
+# Ký JWT thuật toán HS* trực tiếp bằng hmac: header base64url và HMAC đã nạp key được
+# dựng sẵn một lần, mỗi token chỉ còn serialize payload và một lần tính HMAC.
+# Thuật toán khác (RS*, ES*...) vẫn ký qua jose với _JWT_KEY
+_JWT_HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+
+def _b64url(data: bytes) -> bytes:
+    """Base64url không padding theo chuẩn JWS"""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _jwt_hmac_signer(secret_key: str, algorithm: str) -> Tuple[bytes, Optional["hmac.HMAC"]]:
+    """
+    Dựng header JWT (base64url, cùng định dạng với jose) và HMAC đã nạp key cho thuật toán HS*
+    
+    Args:
+        secret_key: Secret ký token
+        algorithm: Thuật toán JWT
+        
+    Returns:
+        Tuple[bytes, Optional[hmac.HMAC]]: Header đã mã hóa và HMAC (None nếu không phải HS*)
+    """
+    header = _b64url(
+        json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":"), sort_keys=True).encode()
+    )
+    if algorithm not in _JWT_HMAC_DIGESTS:
+        return header, None
+    return header, hmac.new(secret_key.encode(), digestmod=_JWT_HMAC_DIGESTS[algorithm])
+
+
+_JWT_HEADER_B64, _JWT_HMAC = _jwt_hmac_signer(settings.secret_key, settings.algorithm)
+
+
+def encode_jwt(claims: dict) -> str:
+    """
+    Ký JWT với secret_key/algorithm của ứng dụng
+    
+    Args:
+        claims: Payload, các giá trị phải serialize được sang JSON (exp là timestamp int)
+        
+    Returns:
+        str: JWT token
+    """
+    if _JWT_HMAC is None:
+        return jwt.encode(claims, _JWT_KEY, algorithm=settings.algorithm)
+    signing_input = _JWT_HEADER_B64 + b"." + _b64url(orjson.dumps(claims))
+    mac = _JWT_HMAC.copy()
+    mac.update(signing_input)
+    return (signing_input + b"." + _b64url(mac.digest())).decode()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -58,16 +123,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode = data.copy()
     
     # Thiết lập thời gian hết hạn
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
+    expire = datetime.utcnow() + (expires_delta or ACCESS_TTL)
     
-    to_encode.update({"exp": expire})
+    to_encode["exp"] = timegm(expire.utctimetuple())
     
     # Tạo và trả về JWT token
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
-    return encoded_jwt
+    return encode_jwt(to_encode)
 
 
 def verify_token(token: str) -> Optional[dict]:
@@ -81,12 +142,41 @@ def verify_token(token: str) -> Optional[dict]:
         Optional[dict]: Payload của token nếu hợp lệ, None nếu không
     """
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, _JWT_KEY, algorithms=[settings.algorithm])
         return payload
     except JWTError:
         return None
 
 
+@lru_cache(maxsize=16384)
+def _decode_token_subject(token: str) -> Optional[Tuple[str, float]]:
+    """Verify chữ ký một lần cho mỗi token, trả về (sub, exp)"""
+    payload = verify_token(token)
+    if payload is None or payload.get("sub") is None:
+        return None
+    return payload["sub"], payload.get("exp", float("inf"))
+
+
+def get_token_subject(token: str) -> Optional[str]:
+    """
+    Lấy subject (user_id) từ JWT token, có cache kết quả verify chữ ký
+    
+    Args:
+        token: JWT token cần xác thực
+        
+    Returns:
+        Optional[str]: Subject của token nếu hợp lệ và chưa hết hạn, None nếu không
+    """
+    decoded = _decode_token_subject(token)
+    if decoded is None:
+        return None
+    subject, expires_at = decoded
+    # Token đã cache vẫn phải kiểm tra hạn ở mỗi request
+    if expires_at <= time.time():
+        return None
+    return subject
+
+
 def generate_totp_secret() -> str:
     """
     Tạo TOTP secret key cho Google Authenticator
@@ -131,9 +221,33 @@ def generate_totp_qr_code(email: str, secret: str) -> str:
     return f"data:image/png;base64,{img_base64}"
 
 
+# Tham số TOTP chuẩn (giống mặc định của pyotp/Google Authenticator)
+_TOTP_INTERVAL = 30
+_TOTP_DIGITS = 6
+_TOTP_MODULO = 10 ** _TOTP_DIGITS
+
+
+def _totp_key(secret: str) -> bytes:
+    """Decode base32 secret thành key HMAC (bổ sung padding như pyotp)"""
+    secret = secret.strip()
+    missing_padding = len(secret) % 8
+    if missing_padding:
+        secret += "=" * (8 - missing_padding)
+    return base64.b32decode(secret, casefold=True)
+
+
+def _totp_at(key: bytes, counter: int) -> bytes:
+    """Tính mã TOTP (HMAC-SHA1, dynamic truncation theo RFC 4226) cho một bước thời gian"""
+    digest = hmac.digest(key, struct.pack(">Q", counter), "sha1")
+    offset = digest[-1] & 0x0F
+    value = struct.unpack_from(">I", digest, offset)[0] & 0x7FFFFFFF
+    return b"%0*d" % (_TOTP_DIGITS, value % _TOTP_MODULO)
+
+
 def verify_totp_code(secret: str, code: str) -> bool:
     """
     Xác thực TOTP code từ Google Authenticator
+    Kiểm tra bước thời gian hiện tại và ±1 bước, dừng ở mã khớp đầu tiên
     
     Args:
         secret: TOTP secret key
@@ -142,8 +256,19 @@ def verify_totp_code(secret: str, code: str) -> bool:
     Returns:
         bool: True nếu mã hợp lệ
     """
-    totp = pyotp.TOTP(secret)
-    return totp.verify(code, valid_window=1)
+    if not secret or not code:
+        return False
+    try:
+        key = _totp_key(secret)
+    except (ValueError, TypeError):
+        return False
+    
+    code_bytes = code.encode()
+    counter = int(time.time()) // _TOTP_INTERVAL
+    for step in (counter, counter - 1, counter + 1):
+        if hmac.compare_digest(code_bytes, _totp_at(key, step)):
+            return True
+    return False
 
 
 def generate_backup_codes(count: int = 10) -> list:
@@ -156,7 +281,6 @@ def generate_backup_codes(count: int = 10) -> list:
     Returns:
         list: Danh sách backup codes
     """
-    import secrets
     import string
     
     codes = []
@@ -175,18 +299,19 @@ def generate_email_otp() -> str:
     Returns:
         str: OTP 6 số
     """
-    import random
-    return str(random.randint(100000, 999999))
+    # Một lần gọi CSPRNG, định dạng đủ 6 chữ số (giữ số 0 ở đầu)
+    return f"{secrets.randbelow(1_000_000):06d}"
 
 
-def is_otp_expired(otp_expiry: datetime) -> bool:
+def is_otp_expired(otp_expiry: datetime, now: Optional[datetime] = None) -> bool:
     """
     Kiểm tra xem OTP có hết hạn không
     
     Args:
         otp_expiry: Thời gian hết hạn của OTP
+        now: Thời điểm hiện tại đã lấy sẵn (optional)
         
     Returns:
         bool: True nếu OTP đã hết hạn
     """
-    return datetime.utcnow() > otp_expiry
\ No newline at end of file
+    return (now or datetime.utcnow()) > otp_expiry
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Pagination utilities - Phân trang keyset theo (created_at, id)
+Cursor là (created_at, id) của bản ghi cuối trang trước, mã hóa base64url để client coi như chuỗi mờ
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Integer, literal, tuple_
+
+# Header trả cursor của trang kế tiếp (không có header nghĩa là đã hết dữ liệu)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, last_id: int) -> str:
+    """
+    Mã hóa (created_at, id) của bản ghi cuối trang thành cursor
+
+    Args:
+        created_at: Thời điểm tạo của bản ghi cuối cùng trang hiện tại
+        last_id: ID bản ghi cuối cùng của trang hiện tại
+
+    Returns:
+        str: Cursor base64url (không padding)
+    """
+    raw = f"{created_at.isoformat()}|{last_id}"
+    return base64.urlsafe_b64encode(raw.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Giải mã cursor thành (created_at, id) của bản ghi cuối trang trước
+
+    Args:
+        cursor: Cursor nhận từ client
+
+    Returns:
+        Tuple[datetime, int]: Thời điểm tạo và ID bản ghi cuối trang trước
+
+    Raises:
+        HTTPException: Nếu cursor không hợp lệ
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, last_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor không hợp lệ"
+        )
+
+
+def keyset_before(model, cursor: str):
+    """
+    Điều kiện lấy các bản ghi đứng sau cursor theo thứ tự (created_at DESC, id DESC)
+
+    So sánh với giá trị nằm sẵn trong cursor (không đọc lại bản ghi cursor), nên trang sau
+    vẫn đúng khi bản ghi cuối trang trước đã bị xóa. Thời điểm được bind theo kiểu của
+    cột created_at (CreatedAt) để cùng định dạng lưu trữ với dữ liệu trong bảng
+
+    Args:
+        model: Model có cột created_at và id (Task, Notification, ...)
+        cursor: Cursor nhận từ client
+
+    Returns:
+        Biểu thức điều kiện dùng trong filter/where
+    """
+    created_at, last_id = decode_cursor(cursor)
+    return tuple_(model.created_at, model.id) < tuple_(
+        literal(created_at, model.created_at.type), literal(last_id, Integer())
+    )
+
+
+def reject_skip_with_cursor(skip: int, cursor: Optional[str]) -> None:
+    """
+    Không cho dùng skip cùng cursor (OFFSET sau điều kiện keyset không có nghĩa rõ ràng)
+
+    Args:
+        skip: Số bản ghi bỏ qua
+        cursor: Cursor nhận từ client
+
+    Raises:
+        HTTPException: Nếu truyền cả skip và cursor
+    """
+    if skip and cursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Không dùng skip cùng cursor"
+        )
+
+
+def next_cursor(rows: list, limit: int) -> Optional[str]:
+    """
+    Cắt danh sách đã lấy dư một bản ghi (limit + 1) về đúng limit và tính cursor trang sau
+
+    Args:
+        rows: Danh sách bản ghi (có created_at và id) lấy với LIMIT limit + 1 (bị cắt tại chỗ)
+        limit: Số bản ghi tối đa của một trang
+
+    Returns:
+        Optional[str]: Cursor trang kế tiếp, None nếu đây là trang cuối
+    """
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    return encode_cursor(rows[-1].created_at, rows[-1].id)
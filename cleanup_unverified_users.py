@@ -0,0 +1,12 @@
+"""
+Script dọn các tài khoản đăng ký bỏ dở (chưa xác thực, OTP đã hết hạn quá 1 ngày)
+Dùng cho cron thay vì bật job nền trong từng worker của app
+"""
+
+from app.database import cleanup_unverified_users
+from app.models import *  # noqa: F401,F403 (đảm bảo load models để lấy khóa ngoại tới users)
+
+
+if __name__ == "__main__":
+    deleted = cleanup_unverified_users()
+    print(f"🗑️ Đã xóa {deleted} tài khoản chưa xác thực")
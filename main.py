@@ -1,17 +1,27 @@
 """
 Todo List Application
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
+import asyncio
+import json
+import logging
 import uvicorn
+from starlette.concurrency import run_in_threadpool
 
 from app.config import settings
-from app.database import Base, engine, ensure_schema
+from app.database import Base, cleanup_unverified_users, engine, ensure_schema
 from app.models import *  # noqa: F401,F403 (đảm bảo load models)
 
+# Cấu hình logging: production chỉ ghi WARNING, môi trường debug bật log chi tiết cho app
+logging.basicConfig(level=logging.WARNING if settings.environment == "production" else logging.INFO)
+if settings.debug and settings.environment != "production":
+    logging.getLogger("app").setLevel(logging.DEBUG)
+
 # Đảm bảo schema đã được cập nhật cho database hiện có
 try:
     Base.metadata.create_all(bind=engine)
@@ -20,6 +30,38 @@ try:
 except Exception as e:
     print(f"❌ Database init error: {e}")
 
+# Dọn các đăng ký bỏ dở định kỳ (chạy trong threadpool vì truy vấn DB đồng bộ).
+# Mỗi worker có lifespan riêng nên job chỉ chạy khi CLEANUP_UNVERIFIED_USERS_ENABLED=true,
+# đặt cho đúng một worker hoặc thay bằng cron gọi cleanup_unverified_users.py
+_CLEANUP_INTERVAL_SECONDS = 3600
+
+
+async def _cleanup_unverified_users_periodically():
+    while True:
+        try:
+            await run_in_threadpool(cleanup_unverified_users)
+        except Exception:
+            logging.getLogger(__name__).exception("Lỗi khi dọn tài khoản chưa xác thực")
+        await asyncio.sleep(_CLEANUP_INTERVAL_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Chạy job nền khi app khởi động (nếu được bật trong cấu hình) và hủy job khi app tắt"""
+    if not settings.cleanup_unverified_users_enabled:
+        yield
+        return
+    cleanup_task = asyncio.create_task(_cleanup_unverified_users_periodically())
+    try:
+        yield
+    finally:
+        cleanup_task.cancel()
+        try:
+            await cleanup_task
+        except asyncio.CancelledError:
+            pass
+
+
 # FastAPI app
 app = FastAPI(
     title="VTeam",
@@ -27,6 +69,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,  # orjson nhanh hơn json chuẩn khi trả danh sách lớn
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -36,6 +80,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Static files and templates
@@ -46,12 +91,10 @@ from app.routers.auth import router as auth_router
 from app.routers.tasks import router as tasks_router
 from app.routers.teams import router as teams_router
 from app.routers.invitations import router as invitations_router
-from app.routers.invitations_user import router as invitations_user_router
 app.include_router(auth_router)
 app.include_router(tasks_router)
 app.include_router(teams_router)
 app.include_router(invitations_router)
-app.include_router(invitations_user_router)
 print("✅ Routers loaded (auth, tasks, teams, invitations)")
 
 # Route handlers
@@ -128,21 +171,25 @@ async def team_detail_page(request: Request, team_id: int):
         "team_id": team_id
     })
 
+# Nội dung health check không đổi nên serialize một lần khi khởi động
+_HEALTH_BODY = json.dumps({
+    "status": "healthy",
+    "version": "1.0.0",
+    "service": "todo_list_clean",
+    "database": "sqlite",
+    "features": [
+        "email_registration_with_otp",
+        "password_login",
+        "password_reset_with_otp",
+        "jwt_authentication"
+    ]
+}).encode()
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "version": "1.0.0",
-        "service": "todo_list_clean",
-        "database": "sqlite",
-        "features": [
-            "email_registration_with_otp",
-            "password_login",
-            "password_reset_with_otp",
-            "jwt_authentication"
-        ]
-    }
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 # Error handlers
 @app.exception_handler(404)
@@ -27,7 +27,7 @@ class TodoApp {
 
     async acceptInvitation(token) {
         try {
-            return await this.apiCall(`/invitations/accept/${token}`, 'GET');
+            return await this.apiCall('/invitations/accept', 'POST', { token });
         } catch (e) {
             throw e;
         }
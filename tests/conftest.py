@@ -0,0 +1,9 @@
+"""
+Cấu hình chung cho tests: dùng database SQLite tạm thay cho todo_app.db
+(phải đặt biến môi trường trước khi app.config được import)
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
@@ -0,0 +1,31 @@
+"""
+Kiểm tra encode_jwt (ký HS* bằng hmac) cho ra đúng token như python-jose
+"""
+
+import pytest
+from jose import jwt
+
+from app.utils import auth as auth_utils
+
+SECRET = "test-secret-key"
+
+
+@pytest.fixture(params=["HS256", "HS384", "HS512"])
+def algorithm(request, monkeypatch):
+    """Dựng lại header/HMAC của module cho từng thuật toán HS*"""
+    header, keyed_hmac = auth_utils._jwt_hmac_signer(SECRET, request.param)
+    monkeypatch.setattr(auth_utils, "_JWT_HEADER_B64", header)
+    monkeypatch.setattr(auth_utils, "_JWT_HMAC", keyed_hmac)
+    return request.param
+
+
+def test_encode_jwt_matches_jose_bytes(algorithm):
+    claims = {"sub": "42", "email": "user@example.com", "exp": 1_900_000_000}
+    assert auth_utils.encode_jwt(claims) == jwt.encode(claims, SECRET, algorithm=algorithm)
+
+
+def test_encode_jwt_non_ascii_claims_decode_with_jose(algorithm):
+    # orjson giữ nguyên UTF-8 còn jose escape \uXXXX: byte khác nhau nhưng cùng payload
+    claims = {"sub": "7", "name": "Nguyễn Văn A", "exp": 1_900_000_000}
+    token = auth_utils.encode_jwt(claims)
+    assert jwt.decode(token, SECRET, algorithms=[algorithm]) == claims
@@ -0,0 +1,146 @@
+"""
+Kiểm tra phân trang keyset theo (created_at, id): nhiều bản ghi cùng giây, bản ghi cursor
+bị xóa giữa hai trang, và không cho dùng skip cùng cursor
+"""
+
+from datetime import datetime
+from itertools import count
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.database import SessionLocal
+from app.models.notification import Notification, NotificationTypeEnum
+from app.models.task import Task
+from app.models.user import User
+from app.services.auth_service import auth_service
+from app.services.notification_service import notification_service
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+_EMAILS = count(1)
+
+# Nhiều bản ghi cùng một giây, ghi từ Python (kể cả có micro giây) xen với server_default
+_CREATED_AT = [
+    None, None,
+    datetime(2026, 1, 1, 10, 0, 0),
+    datetime(2026, 1, 1, 10, 0, 0, 250000),
+    datetime(2026, 1, 1, 10, 0, 0),
+    datetime(2026, 1, 1, 10, 0, 0),
+    datetime(2026, 1, 1, 9, 0, 0),
+    datetime(2026, 1, 1, 9, 0, 0),
+]
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db):
+    user = User(
+        email=f"paging{next(_EMAILS)}@example.com", hashed_password="x", is_active=True, is_verified=True
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _expected_order(db, model, ids):
+    """Thứ tự mong đợi: created_at (đến giây) giảm dần, rồi id giảm dần"""
+    rows = db.query(model.id, model.created_at).filter(model.id.in_(ids)).all()
+    return [row.id for row in sorted(rows, key=lambda row: (row.created_at.replace(microsecond=0), row.id), reverse=True)]
+
+
+def _add_rows(db, make):
+    rows = [make(created_at) for created_at in _CREATED_AT]
+    db.add_all(rows)
+    db.commit()
+    return [row.id for row in rows]
+
+
+@pytest.fixture
+def client(user):
+    token = auth_service.create_access_token(data={"sub": str(user.id), "email": user.email})
+    client = TestClient(main.app)
+    client.headers["Authorization"] = f"Bearer {token}"
+    return client
+
+
+@pytest.fixture
+def task_ids(db, user):
+    # Gán cho chính user: task chưa gán hiển thị với mọi user, sẽ lẫn giữa các test
+    return _add_rows(db, lambda created_at: Task(
+        title="t", creator_id=user.id, assignee_id=user.id, **({"created_at": created_at} if created_at else {})
+    ))
+
+
+def _walk_tasks(client, limit, after_first_page=None):
+    ids, cursor, first = [], None, True
+    for _ in range(len(_CREATED_AT) + 1):  # cursor hỏng có thể lặp lại trang: không lặp vô hạn
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/v1/tasks/", params=params)
+        assert response.status_code == 200
+        page = [task["id"] for task in response.json()]
+        ids += page
+        if first and after_first_page:
+            after_first_page(page)
+        first = False
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return ids
+    pytest.fail(f"Phân trang không kết thúc: {ids}")
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3])
+def test_task_pages_cover_equal_seconds_without_gaps(client, db, task_ids, limit):
+    assert _walk_tasks(client, limit) == _expected_order(db, Task, task_ids)
+
+
+def test_task_paging_continues_after_cursor_row_deleted(client, db, task_ids):
+    expected = _expected_order(db, Task, task_ids)
+    deleted = []
+
+    def delete_cursor_row(page):
+        # Bản ghi cuối trang 1 (bản ghi cursor) nằm giữa nhóm cùng giây 10:00:00
+        deleted.append(page[-1])
+        db.query(Task).filter(Task.id == page[-1]).delete()
+        db.commit()
+
+    assert _walk_tasks(client, 3, delete_cursor_row) == expected
+    assert deleted == [expected[2]]
+
+
+def test_skip_with_cursor_is_rejected(client, task_ids):
+    cursor = client.get("/api/v1/tasks/", params={"limit": 1}).headers[NEXT_CURSOR_HEADER]
+    response = client.get("/api/v1/tasks/", params={"limit": 1, "skip": 1, "cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_skip_alone_still_pages(client, db, task_ids):
+    expected = _expected_order(db, Task, task_ids)
+    response = client.get("/api/v1/tasks/", params={"limit": 2, "skip": 2})
+    assert [task["id"] for task in response.json()] == expected[2:4]
+
+
+def test_notification_pages_after_cursor_row_deleted(db, user):
+    ids = _add_rows(db, lambda created_at: Notification(
+        user_id=user.id, title="n", message="m",
+        notification_type=NotificationTypeEnum.TASK_ASSIGNED.value,
+        **({"created_at": created_at} if created_at else {})
+    ))
+    expected = _expected_order(db, Notification, ids)
+
+    rows, cursor = notification_service.get_user_notifications(db, user.id, limit=3)
+    seen = [row.id for row in rows]
+    db.query(Notification).filter(Notification.id == seen[-1]).delete()
+    db.commit()
+    for _ in range(len(_CREATED_AT)):
+        if cursor is None:
+            break
+        rows, cursor = notification_service.get_user_notifications(db, user.id, cursor=cursor, limit=3)
+        seen += [row.id for row in rows]
+    assert seen == expected
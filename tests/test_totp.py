@@ -0,0 +1,40 @@
+"""
+Kiểm tra verify_totp_code (HMAC-SHA1 trực tiếp) cho cùng kết quả với pyotp.TOTP.verify
+"""
+
+import pyotp
+import pytest
+
+from app.utils import auth as auth_utils
+
+NOW = 1_760_000_015  # giữa một bước 30 giây
+
+
+@pytest.fixture
+def frozen_time(monkeypatch):
+    monkeypatch.setattr(auth_utils.time, "time", lambda: NOW)
+
+
+@pytest.mark.parametrize("secret", [
+    pyotp.random_base32(),
+    "JBSWY3DPEHPK3PXP",  # 16 ký tự, không cần padding
+    "jbswy3dpehpk3pxpjbswy3dpeh",  # chữ thường, cần bổ sung padding
+])
+def test_verify_totp_code_matches_pyotp(frozen_time, secret):
+    totp = pyotp.TOTP(secret)
+    for offset in range(-60, 61):
+        code = totp.at(NOW + offset)
+        expected = totp.verify(code, for_time=NOW, valid_window=1)
+        assert auth_utils.verify_totp_code(secret, code) is expected, offset
+
+
+def test_verify_totp_code_rejects_wrong_code(frozen_time):
+    secret = pyotp.random_base32()
+    window = {pyotp.TOTP(secret).at(NOW + step * 30) for step in (-1, 0, 1)}
+    wrong = next(code for code in ("000000", "123456", "999999") if code not in window)
+    assert auth_utils.verify_totp_code(secret, wrong) is False
+
+
+@pytest.mark.parametrize("secret, code", [(None, "123456"), ("JBSWY3DPEHPK3PXP", ""), ("not base32!", "123456")])
+def test_verify_totp_code_invalid_input(secret, code):
+    assert auth_utils.verify_totp_code(secret, code) is False